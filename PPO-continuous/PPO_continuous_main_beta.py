@@ -83,6 +83,8 @@ def main(args, env_name, number, seed):
         log_dir='runs/PPO_continuous/env_{}_{}_number_{}_seed_{}_7'.format(env_name, args.policy_dist, number, seed))
 
     state_norm = Normalization(shape=args.state_dim)  # Trick 2:state normalization
+    state_buffers = np.zeros((2, args.state_dim), dtype=np.float32)  # s 和 s_ 轮流使用的归一化输出，每步不分配新数组
+    reward_buffer = np.zeros(1, dtype=np.float32)
     if args.use_reward_norm:  # Trick 3:reward normalization
         reward_norm = Normalization(shape=1)
     elif args.use_reward_scaling:  # Trick 4:reward scaling
@@ -91,7 +93,7 @@ def main(args, env_name, number, seed):
     while total_steps < args.max_train_steps:
         s = env.reset()
         if args.use_state_norm:
-            s = state_norm(s)
+            s = state_norm(s, out=state_buffers[0])
         if args.use_reward_scaling:
             reward_scaling.reset()
         episode_steps = 0
@@ -110,11 +112,11 @@ def main(args, env_name, number, seed):
                 # print(a)
                 # print(r)
             if args.use_state_norm:
-                s_ = state_norm(s_)
+                s_ = state_norm(s_, out=state_buffers[episode_steps % 2])  # 与 s 所在的缓冲区错开
             if args.use_reward_norm:
                 r = reward_norm(r)
             elif args.use_reward_scaling:
-                r = reward_scaling(r)
+                r = reward_scaling(r, out=reward_buffer)
 
             # When dead or win or reaching the max_episode_steps, done will be Ture, we need to distinguish them;
             # dw means dead or win,there is no next state s';
@@ -168,6 +170,7 @@ def main(args, env_name, number, seed):
                     if evaluate_rewards[-1] > evaluate_rewards[-2] and total_steps > 80 * 1e3:
                         torch.save(agent.actor.state_dict(),
                                    './PPO_actor_newest.pth')  # 保存权重少了state_dict智障行为
+                        agent.export_npz('./PPO_actor_newest.npz', state_norm if args.use_state_norm else None)  # numpy_policy 部署用
                         loguru.logger.warning("已保存权重！")
 
 
@@ -198,6 +201,9 @@ if __name__ == '__main__':
     parser.add_argument("--use_orthogonal_init", type=bool, default=True, help="Trick 8: orthogonal initialization")
     parser.add_argument("--set_adam_eps", type=float, default=True, help="Trick 9: set Adam epsilon=1e-5")
     parser.add_argument("--use_tanh", type=float, default=True, help="Trick 10: tanh activation function")
+    parser.add_argument("--use_fused_update", type=bool, default=False,
+                        help="Single optimizer step and backward pass for actor and critic")
+    parser.add_argument("--value_coef", type=float, default=0.5, help="Critic loss coefficient in the fused update")
 
     args = parser.parse_args()
 
@@ -1,30 +1,20 @@
 import time
 
-import torch
 import numpy as np
-from torch.utils.tensorboard import SummaryWriter
 # import gym
 # from common.myenv_simulate import MyEnv
 from common.myenv import MyEnv
 
 import argparse
 from normalization import Normalization, RewardScaling
-from replaybuffer import ReplayBuffer
-from ppo_continuous import PPO_continuous
 from datetime import datetime
 
 
 def main(args, env_name, number, seed):
-    # Build a tensorboard
-    suff = datetime.now().strftime("%H%M")
-    writer = SummaryWriter(
-        log_dir='runs/PPO_predict/{}'.format(suff))
-
     env = MyEnv()
     # Set random seed
     env.seed(seed)
     np.random.seed(seed)
-    torch.manual_seed(seed)
 
     args.state_dim = env.observation_space.shape[0]
     args.action_dim = env.action_space.shape[0]
@@ -43,13 +33,31 @@ def main(args, env_name, number, seed):
     evaluate_rewards = []  # Record the rewards during the evaluating
     total_steps = 0  # Record the total steps during the training
 
-    # replay_buffer = ReplayBuffer(args)
-    agent = PPO_continuous(args)
-    #  加载权重
-    weight_file = './PPO_actor_newest_0140.pth'
-    act = torch.load(weight_file)
-    # act = torch.load(weight_file).state_dict()
-    agent.actor.load_state_dict(act, strict=False)
+    if args.policy_npz:
+        # 只用 numpy 的策略，不导入 torch 和 tensorboard；和 torch 路径一样直接输入未归一化的 s
+        from numpy_policy import Policy
+        policy = Policy(args.policy_npz)
+        writer = None
+    else:
+        import torch
+        from torch.utils.tensorboard import SummaryWriter
+        from ppo_continuous import PPO_continuous
+        # Build a tensorboard
+        suff = datetime.now().strftime("%H%M")
+        writer = SummaryWriter(
+            log_dir='runs/PPO_predict/{}'.format(suff))
+        torch.manual_seed(seed)
+
+        # replay_buffer = ReplayBuffer(args)
+        agent = PPO_continuous(args)
+        #  加载权重
+        weight_file = './PPO_actor_newest_0140.pth'
+        act = torch.load(weight_file)
+        # act = torch.load(weight_file).state_dict()
+        agent.actor.load_state_dict(act, strict=False)
+        # 默认用编译后的确定性策略，单步推理延迟更低更稳定
+        policy = agent.compile_inference() if args.use_compiled_policy else None
+        action_scale, action_offset = agent.action_mapping()  # 与 export_npz 导出的映射相同
 
     state_norm = Normalization(shape=args.state_dim)  # Trick 2:state normalization
     if args.use_reward_norm:  # Trick 3:reward normalization
@@ -74,14 +82,17 @@ def main(args, env_name, number, seed):
             # if episode_steps >= 1000:
             #     env.reset()
             #     quit()
-            a, a_logprob = agent.choose_action(s)  # Action and the corresponding log probability
-            if args.policy_dist == "Beta":
-                action = -2 * (a - 0.5) * args.max_action  # [0,1]->[-max,max]
+            if args.policy_npz:
+                action = policy.action(s)  # 导出的 .npz 里带着动作到电压的映射
             else:
-                action = -a
+                if policy is not None:
+                    a = policy.act(s)  # Deterministic action from the compiled actor
+                else:
+                    a, a_logprob = agent.choose_action(s)  # Action and the corresponding log probability
+                action = a * action_scale + action_offset
             s_, r, done, _ = env.step(action)
             if episode_steps % 1 == 0:
-                print('s:', s_, 'a:', a, 'r:', r)
+                print('s:', s_, 'action:', action, 'r:', r)
                 # print(s)
                 # print(a)
                 # print(r)
@@ -115,6 +126,8 @@ def main(args, env_name, number, seed):
             # replay_buffer.store(s, a, a_logprob, r, s_, dw, done)
             s = s_
             total_steps += 1
+            if writer is None:
+                continue
             #
             # U
             writer.add_scalar('U/left', a[0], global_step=total_steps)
@@ -157,6 +170,13 @@ if __name__ == '__main__':
     parser.add_argument("--use_orthogonal_init", type=bool, default=True, help="Trick 8: orthogonal initialization")
     parser.add_argument("--set_adam_eps", type=float, default=True, help="Trick 9: set Adam epsilon=1e-5")
     parser.add_argument("--use_tanh", type=float, default=True, help="Trick 10: tanh activation function")
+    parser.add_argument("--use_fused_update", type=bool, default=False,
+                        help="Single optimizer step and backward pass for actor and critic")
+    parser.add_argument("--value_coef", type=float, default=0.5, help="Critic loss coefficient in the fused update")
+    parser.add_argument("--use_compiled_policy", type=bool, default=True,
+                        help="Act with the frozen TorchScript deterministic actor instead of sampling in eager mode")
+    parser.add_argument("--policy_npz", type=str, default=None,
+                        help="Run the numpy-only policy exported by PPO_continuous.export_npz (no torch import)")
 
     args = parser.parse_args()
 
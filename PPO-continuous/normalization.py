@@ -3,50 +3,120 @@ import numpy as np
 
 class RunningMeanStd:
     # Dynamically calculate mean and std
+    # mean/S 原地更新，std 只在读取时按需重新计算
     def __init__(self, shape):  # shape:the dimension of input data
         self.n = 0
         self.mean = np.zeros(shape)
         self.S = np.zeros(shape)
-        self.std = np.sqrt(self.S)
+        self._std = np.sqrt(self.S)
+        self._std_stale = False
+        self._d1 = np.zeros(shape)  # 更新时用的临时缓冲区
+        self._d2 = np.zeros(shape)
+
+    @property
+    def std(self):
+        if self._std_stale:
+            np.divide(self.S, self.n, out=self._std)
+            np.sqrt(self._std, out=self._std)
+            self._std_stale = False
+        return self._std
 
     def update(self, x):
-        x = np.array(x)
         self.n += 1
         if self.n == 1:
-            self.mean = x
-            self.std = x
+            self.mean[...] = x
+            self._std[...] = x
+            self._std_stale = False
+        else:
+            np.subtract(x, self.mean, out=self._d1)  # x - old_mean
+            np.divide(self._d1, self.n, out=self._d2)
+            self.mean += self._d2
+            np.subtract(x, self.mean, out=self._d2)  # x - new_mean
+            self._d2 *= self._d1
+            self.S += self._d2
+            self._std_stale = True
+
+    # x: (B, dim) 一批样本，一次向量运算合并进统计量
+    def update_batch(self, x):
+        x = np.asarray(x, dtype=np.float64).reshape((-1,) + np.shape(self.S))
+        if len(x) == 1:  # 保持单样本 update 的行为（包括 n == 1 时的 std）
+            self.update(x[0])
+            return
+        batch_mean = x.mean(axis=0)
+        self._combine(len(x), batch_mean, np.square(x - batch_mean).sum(axis=0))
+
+    # 合并另一个 RunningMeanStd（如各 worker 各自统计的结果）
+    def merge(self, other):
+        self._combine(other.n, other.mean, other.S)
+
+    # Chan 等人的并行方差算法：两组样本的 (n, mean, S) 直接合并
+    def _combine(self, n_b, mean_b, S_b):
+        if n_b == 0:
+            return
+        n = self.n + n_b
+        np.subtract(mean_b, self.mean, out=self._d1)
+        np.square(self._d1, out=self._d2)
+        self._d2 *= self.n * n_b / n
+        self.S += S_b
+        self.S += self._d2
+        self._d1 *= n_b / n
+        self.mean += self._d1
+        self.n = n
+        if self.n == 1:
+            self._std[...] = self.mean
+            self._std_stale = False
         else:
-            old_mean = self.mean.copy()
-            self.mean = old_mean + (x - old_mean) / self.n
-            self.S = self.S + (x - old_mean) * (x - self.mean)
-            self.std = np.sqrt(self.S / self.n)
+            self._std_stale = True
 
 
 class Normalization:
-    def __init__(self, shape):
+    # dtype 为输出的类型；传入 out 时结果写进 out，不分配新数组
+    def __init__(self, shape, dtype=np.float32):
         self.running_ms = RunningMeanStd(shape=shape)
+        self.dtype = dtype
+        self._denom = np.zeros(shape)
 
-    def __call__(self, x, update=True):
+    def __call__(self, x, update=True, out=None):
         # Whether to update the mean and std,during the evaluating,update=False
         if update:
             self.running_ms.update(x)
-        x = (x - self.running_ms.mean) / (self.running_ms.std + 1e-8)
+        if out is None:
+            out = np.empty(np.shape(self.running_ms.mean), dtype=self.dtype)
+        np.add(self.running_ms.std, 1e-8, out=self._denom)
+        np.subtract(x, self.running_ms.mean, out=out)
+        np.divide(out, self._denom, out=out)
+        return out
 
-        return x
+    # x: (N, dim)，N 个环境的观测一起更新统计量并归一化
+    def batch(self, x, update=True, out=None):
+        if update:
+            self.running_ms.update_batch(x)
+        if out is None:
+            out = np.empty(np.shape(x), dtype=self.dtype)
+        np.add(self.running_ms.std, 1e-8, out=self._denom)
+        np.subtract(x, self.running_ms.mean, out=out)
+        np.divide(out, self._denom, out=out)
+        return out
 
 
 class RewardScaling:
-    def __init__(self, shape, gamma):
+    def __init__(self, shape, gamma, dtype=np.float32):
         self.shape = shape  # reward shape=1
         self.gamma = gamma  # discount factor
+        self.dtype = dtype
         self.running_ms = RunningMeanStd(shape=self.shape)
         self.R = np.zeros(self.shape)
+        self._denom = np.zeros(self.shape)
 
-    def __call__(self, x):
-        self.R = self.gamma * self.R + x
+    def __call__(self, x, out=None):
+        self.R *= self.gamma
+        self.R += x
         self.running_ms.update(self.R)
-        x = x / (self.running_ms.std + 1e-8)  # Only divided std
-        return x
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        np.add(self.running_ms.std, 1e-8, out=self._denom)
+        np.divide(x, self._denom, out=out)  # Only divided std
+        return out
 
     def reset(self):  # When an episode is done,we should reset 'self.R'
-        self.R = np.zeros(self.shape)
+        self.R[...] = 0.0
@@ -0,0 +1,92 @@
+import numpy as np
+
+'''只依赖 numpy 的确定性策略，读取 PPO_continuous.export_npz 导出的 .npz，用于实机部署时不导入 torch
+前向计算写入预分配的缓冲区。act(s) 与 CompiledPolicy.act 的约定相同：s 是 actor 的输入（不在内部做状态归一化），
+返回 actor 的确定性输出；训练时用了状态归一化的话，先用 normalize(s) 按导出的均值和标准差处理，两条路径都由调用方负责。
+action(s) 再按导出的映射 a * action_scale + action_offset（含实机上的符号）得到电压'''
+
+
+def softplus(x, out):
+    return np.logaddexp(0.0, x, out=out)
+
+
+class Policy:
+    def __init__(self, path):
+        data = np.load(path)
+        self.policy_dist = str(data['policy_dist'])
+        self.activate = np.tanh if bool(data['use_tanh']) else (lambda x, out: np.maximum(x, 0.0, out=out))
+        self.max_action = float(data['max_action'])
+        self.action_scale = float(data['action_scale'])
+        self.action_offset = float(data['action_offset'])
+        # 权重转置成 (in, out) 并转为 float64，和 float64 的状态直接相乘
+        self.W1, self.b1 = data['fc1.weight'].T.astype(np.float64), data['fc1.bias'].astype(np.float64)
+        self.W2, self.b2 = data['fc2.weight'].T.astype(np.float64), data['fc2.bias'].astype(np.float64)
+        if self.policy_dist == "Beta":
+            self.Wa, self.ba = data['alpha_layer.weight'].T.astype(np.float64), data['alpha_layer.bias'].astype(np.float64)
+            self.Wb, self.bb = data['beta_layer.weight'].T.astype(np.float64), data['beta_layer.bias'].astype(np.float64)
+        else:
+            self.Wa, self.ba = data['mean_layer.weight'].T.astype(np.float64), data['mean_layer.bias'].astype(np.float64)
+        if 'state_mean' in data:
+            self.state_mean = data['state_mean'].astype(np.float64)
+            self.state_std = data['state_std'].astype(np.float64) + 1e-8  # 与 Normalization 相同
+        else:
+            self.state_mean = None
+        self.state_dim = self.W1.shape[0]
+        self.action_dim = self.Wa.shape[1]
+        self.s = np.zeros(self.state_dim)
+        self.s_norm = np.zeros(self.state_dim)
+        self.h1 = np.zeros(self.W1.shape[1])
+        self.h2 = np.zeros(self.W2.shape[1])
+        self.a = np.zeros(self.action_dim)
+        self.b = np.zeros(self.action_dim)
+
+    # 按导出时的 state_norm 归一化（没有导出时原样返回）；结果在内部缓冲区里，下次调用会被覆盖
+    def normalize(self, s):
+        self.s_norm[:] = s
+        if self.state_mean is not None:
+            self.s_norm -= self.state_mean
+            self.s_norm /= self.state_std
+        return self.s_norm
+
+    def act(self, s):
+        self.s[:] = s
+        np.dot(self.s, self.W1, out=self.h1)
+        self.h1 += self.b1
+        self.activate(self.h1, out=self.h1)
+        np.dot(self.h1, self.W2, out=self.h2)
+        self.h2 += self.b2
+        self.activate(self.h2, out=self.h2)
+        np.dot(self.h2, self.Wa, out=self.a)
+        self.a += self.ba
+        if self.policy_dist == "Beta":  # Beta 分布的均值 alpha / (alpha + beta)
+            np.dot(self.h2, self.Wb, out=self.b)
+            self.b += self.bb
+            softplus(self.a, out=self.a)
+            softplus(self.b, out=self.b)
+            self.a += 1.0
+            self.b += 1.0
+            self.b += self.a
+            self.a /= self.b
+        else:
+            np.tanh(self.a, out=self.a)
+            self.a *= self.max_action
+        return self.a.copy()
+
+    # 映射到电机电压
+    def action(self, s):
+        a = self.act(s)
+        a *= self.action_scale
+        a += self.action_offset
+        return a
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    policy = Policy(sys.argv[1])
+    s = np.zeros(policy.state_dim)
+    t = time.perf_counter()
+    for _ in range(10000):
+        policy.act(s)
+    print('{} policy, {:.1f} us/step'.format(policy.policy_dist, (time.perf_counter() - t) / 10000 * 1e6))
@@ -1,8 +1,9 @@
-import random
+import copy
+import warnings
 
+import numpy as np
 import torch
 import torch.nn.functional as F
-from torch.utils.data.sampler import BatchSampler, SubsetRandomSampler
 import torch.nn as nn
 from torch.distributions import Beta, Normal
 from loguru import logger
@@ -14,6 +15,48 @@ def orthogonal_init(layer, gain=1.0):
     nn.init.constant_(layer.bias, 0)
 
 
+def compute_gae(deltas, dones, gamma, lamda):
+    """
+    Reverse scan adv[t] = deltas[t] + gamma * lamda * (1 - dones[t]) * adv[t + 1] along dim 0,
+    computed with log2(T) vectorized doubling steps instead of a Python loop over t.
+    deltas/dones: (T,), (T, 1) or (T, N) for N parallel env streams; returns advantages of the same shape
+    """
+    shape, dtype = deltas.shape, deltas.dtype
+    b = deltas.reshape(shape[0], -1).double()
+    a = gamma * lamda * (1.0 - dones.reshape(shape[0], -1).double())
+    # 每一步后 adv[t] = b[t] + a[t] * adv[t + 2k]：b 累加了 [t, t + 2k) 内的 delta，a 是这段的衰减系数之积
+    T, k = b.shape[0], 1
+    while k < T:
+        b = torch.cat([b[:-k] + a[:-k] * b[k:], b[-k:]])
+        a = torch.cat([a[:-k] * a[k:], a[-k:]])
+        k *= 2
+    return b.to(dtype).reshape(shape)
+
+
+# 每个 epoch 一次 randperm，切成连续的 minibatch（最后一个可能不满），与 BatchSampler(SubsetRandomSampler, drop_last=False) 等价
+def minibatch_indices(n, mini_batch_size):
+    return torch.randperm(n).split(mini_batch_size)
+
+
+class MinibatchSampler:
+    """
+    Iterate over one epoch of minibatches of the given (B, dim) tensors. Each minibatch is gathered with
+    index_select into buffers allocated once (pinned when CUDA is available and pin_memory=True), so the
+    yielded tensors are overwritten by the next minibatch.
+    """
+    def __init__(self, tensors, mini_batch_size, pin_memory=False):
+        self.tensors = tensors
+        self.mini_batch_size = mini_batch_size
+        pin_memory = pin_memory and torch.cuda.is_available()
+        self.buffers = [torch.empty((mini_batch_size,) + tuple(x.shape[1:]), dtype=x.dtype, pin_memory=pin_memory)
+                        for x in tensors]
+
+    def __iter__(self):
+        for index in minibatch_indices(self.tensors[0].shape[0], self.mini_batch_size):
+            yield [torch.index_select(x, 0, index, out=buffer[:len(index)])
+                   for x, buffer in zip(self.tensors, self.buffers)]
+
+
 class Actor_Beta(nn.Module):
     def __init__(self, args):
         super(Actor_Beta, self).__init__()
@@ -101,6 +144,42 @@ class Critic(nn.Module):
         return v_s
 
 
+# 推理用的确定性策略：Beta 取分布均值，Gaussian 取 mean
+class DeterministicActor(nn.Module):
+    def __init__(self, actor, policy_dist):
+        super(DeterministicActor, self).__init__()
+        self.actor = actor
+        self.use_beta = policy_dist == "Beta"
+
+    def forward(self, s):
+        if self.use_beta:
+            return self.actor.mean(s)
+        return self.actor(s)
+
+
+class CompiledPolicy:
+    """
+    Frozen TorchScript snapshot of the deterministic actor for low-latency single-state inference.
+    act(s) copies s into a preallocated (1, state_dim) tensor and returns the (action_dim,) action.
+    s is the actor input as is: state normalization, like for numpy_policy.Policy, is up to the caller.
+    The snapshot does not follow later training updates; compile again after the weights change.
+    """
+    def __init__(self, actor, policy_dist, warmup=5):
+        state_dim = actor.fc1.in_features
+        self.s = torch.zeros(1, state_dim)
+        module = DeterministicActor(copy.deepcopy(actor), policy_dist).eval()  # 拷贝一份再切到 eval，不改训练中的 actor
+        with torch.no_grad(), warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)  # 新版 torch 把 torch.jit 标为弃用，但仍是开销最小的推理方式
+            self.module = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.trace(module, self.s)))
+            for _ in range(warmup):  # 前几次调用时 TorchScript 做图优化，提前跑掉
+                self.module(self.s)
+
+    def act(self, s):
+        self.s.copy_(torch.as_tensor(s).reshape(self.s.shape))
+        with torch.no_grad():
+            return self.module(self.s)[0].numpy()
+
+
 class PPO_continuous():
     def __init__(self, args):
         self.policy_dist = args.policy_dist
@@ -119,6 +198,8 @@ class PPO_continuous():
         self.use_grad_clip = args.use_grad_clip
         self.use_lr_decay = args.use_lr_decay
         self.use_adv_norm = args.use_adv_norm
+        self.use_fused_update = args.use_fused_update
+        self.value_coef = args.value_coef  # 融合更新时 critic loss 的系数
 
         if self.policy_dist == "Beta":
             self.actor = Actor_Beta(args)
@@ -126,12 +207,21 @@ class PPO_continuous():
             self.actor = Actor_Gaussian(args)
         self.critic = Critic(args)
 
-        if self.set_adam_eps:  # Trick 9: set Adam epsilon=1e-5
+        if self.use_fused_update:  # 一个优化器，actor 和 critic 各一个参数组（各自的学习率）
+            param_groups = [{'params': self.actor.parameters(), 'lr': self.lr_a},
+                            {'params': self.critic.parameters(), 'lr': self.lr_c}]
+            if self.set_adam_eps:  # Trick 9: set Adam epsilon=1e-5
+                self.optimizer = torch.optim.Adam(param_groups, eps=1e-5)
+            else:
+                self.optimizer = torch.optim.Adam(param_groups)
+        elif self.set_adam_eps:  # Trick 9: set Adam epsilon=1e-5
             self.optimizer_actor = torch.optim.Adam(self.actor.parameters(), lr=self.lr_a, eps=1e-5)
             self.optimizer_critic = torch.optim.Adam(self.critic.parameters(), lr=self.lr_c, eps=1e-5)
         else:
             self.optimizer_actor = torch.optim.Adam(self.actor.parameters(), lr=self.lr_a)
             self.optimizer_critic = torch.optim.Adam(self.critic.parameters(), lr=self.lr_c)
+        self.metrics = {}  # 最近一次 update 中各 minibatch 的平均 actor_loss / critic_loss / entropy
+        self.s_batch = None  # 批量接口复用的输入张量
 
     def evaluate(self, s):  # When evaluating the policy, we only use the mean
         s = torch.unsqueeze(torch.tensor(s, dtype=torch.float), 0)
@@ -156,60 +246,122 @@ class PPO_continuous():
                 a_logprob = dist.log_prob(a)  # The log probability density of the action
         return a.numpy().flatten(), a_logprob.numpy().flatten()
 
+    # (N, state_dim) 的状态拷贝进复用的 float32 输入张量，N 变化时才重新分配
+    def _batch_input(self, s):
+        s = torch.as_tensor(s)
+        if self.s_batch is None or self.s_batch.shape != s.shape:
+            self.s_batch = torch.empty(s.shape, dtype=torch.float)
+        return self.s_batch.copy_(s)
+
+    # 向量化环境用的批量接口：一次前向得到 (N, action_dim) 的动作
+    def evaluate_batch(self, s):
+        s = self._batch_input(s)
+        with torch.no_grad():
+            if self.policy_dist == "Beta":
+                a = self.actor.mean(s)
+            else:
+                a = self.actor(s)
+        return a.numpy()
+
+    # 返回 (N, action_dim) 的动作和对应的 log 概率
+    def choose_action_batch(self, s):
+        s = self._batch_input(s)
+        with torch.no_grad():
+            dist = self.actor.get_dist(s)
+            a = dist.sample()
+            if self.policy_dist != "Beta":
+                a = torch.clamp(a, -self.max_action, self.max_action)  # [-max,max]
+            a_logprob = dist.log_prob(a)
+        return a.numpy(), a_logprob.numpy()
+
+    # 用当前 actor 权重生成编译后的确定性策略
+    def compile_inference(self):
+        return CompiledPolicy(self.actor, self.policy_dist)
+
+    # 确定性输出 a 到电压的映射 action = a * scale + offset：Beta 先把 [0,1] 映射到 [-max,max]，再乘 sign；
+    # 默认 sign=-1 即 PPO_predict_main 在实机上用的 -2 * (a - 0.5) * max_action 和 -a
+    def action_mapping(self, sign=-1.0):
+        if self.policy_dist == "Beta":
+            return 2.0 * sign * self.max_action, -sign * self.max_action
+        return sign, 0.0
+
+    # 导出给 numpy_policy.Policy 用的 .npz：actor 权重、状态归一化统计量和动作映射 action = a * scale + offset
+    def export_npz(self, path, state_norm=None, action_sign=-1.0):
+        data = {name: value.detach().cpu().numpy() for name, value in self.actor.state_dict().items()}
+        data['policy_dist'] = np.array(self.policy_dist)
+        data['use_tanh'] = np.array(isinstance(self.actor.activate_func, nn.Tanh))
+        data['max_action'] = np.array(float(self.max_action))
+        data['action_scale'], data['action_offset'] = (np.array(x) for x in self.action_mapping(action_sign))
+        if state_norm is not None:
+            data['state_mean'] = np.asarray(state_norm.running_ms.mean, dtype=np.float64)
+            data['state_std'] = np.asarray(state_norm.running_ms.std, dtype=np.float64)
+        np.savez(path, **data)
+
     def update(self, replay_buffer, total_steps):
-        s, a, a_logprob, r, s_, dw, done = replay_buffer.numpy_to_tensor()  # Get training data
+        s, a, a_logprob, r, s_, dw, done = replay_buffer.numpy_to_tensor()  # Get training data, (B, dim) or (T, N, dim)
         """
             Calculate the advantage using GAE
             'dw=True' means dead or win, there is no next state s'
             'done=True' represents the terminal of an episode(dead or win or reaching the max_episode_steps). When calculating the adv, if done=True, gae=0
         """
-        adv = []
-        gae = 0
         with torch.no_grad():  # adv and v_target have no gradient
             vs = self.critic(s)
             vs_ = self.critic(s_)
             deltas = r + self.gamma * (1.0 - dw) * vs_ - vs
-            for delta, d in zip(reversed(deltas.flatten().numpy()), reversed(done.flatten().numpy())):
-                gae = delta + self.gamma * self.lamda * gae * (1.0 - d)
-                adv.insert(0, gae)
-            adv = torch.tensor(adv, dtype=torch.float).view(-1, 1)
+            adv = compute_gae(deltas, done, self.gamma, self.lamda)  # (T, N, 1) 的轨迹按列独立计算
             v_target = adv + vs
+            if s.dim() == 3:  # 展平成按转移的视图
+                s, a, a_logprob, adv, v_target = (x.reshape(-1, x.shape[-1]) for x in (s, a, a_logprob, adv, v_target))
             if self.use_adv_norm:  # Trick 1:advantage normalization
                 adv = ((adv - adv.mean()) / (adv.std() + 1e-5))
 
         # Optimize policy for K epochs:
+        sampler = MinibatchSampler((s, a, a_logprob, adv, v_target), self.mini_batch_size)
+        metrics = torch.zeros(3)  # actor_loss, critic_loss, entropy 的累加，不在循环里打印
+        num_minibatches = 0
         for _ in range(self.K_epochs):
-            # Random sampling and no repetition. 'False' indicates that training will continue even if the number of samples in the last time is less than mini_batch_size
-            for index in BatchSampler(SubsetRandomSampler(range(self.batch_size)), self.mini_batch_size, False):
-                dist_now = self.actor.get_dist(s[index])
+            # Random sampling and no repetition. The last minibatch may be smaller than mini_batch_size
+            for s_b, a_b, a_logprob_b, adv_b, v_target_b in sampler:
+                dist_now = self.actor.get_dist(s_b)
                 dist_entropy = dist_now.entropy().sum(1, keepdim=True)  # shape(mini_batch_size X 1)
-                a_logprob_now = dist_now.log_prob(a[index])
+                a_logprob_now = dist_now.log_prob(a_b)
                 # a/b=exp(log(a)-log(b))  In multi-dimensional continuous action space，we need to sum up the log_prob
-                ratios = torch.exp(a_logprob_now.sum(1, keepdim=True) - a_logprob[index].sum(1,
-                                                                                             keepdim=True))  # shape(mini_batch_size X 1)
+                ratios = torch.exp(a_logprob_now.sum(1, keepdim=True) - a_logprob_b.sum(1,
+                                                                                        keepdim=True))  # shape(mini_batch_size X 1)
 
-                surr1 = ratios * adv[index]  # Only calculate the gradient of 'a_logprob_now' in ratios
-                surr2 = torch.clamp(ratios, 1 - self.epsilon, 1 + self.epsilon) * adv[index]
+                surr1 = ratios * adv_b  # Only calculate the gradient of 'a_logprob_now' in ratios
+                surr2 = torch.clamp(ratios, 1 - self.epsilon, 1 + self.epsilon) * adv_b
                 actor_loss = -torch.min(surr1, surr2) - self.entropy_coef * dist_entropy  # Trick 5: policy entropy
-                # Update actor
-                self.optimizer_actor.zero_grad()
-                actor_loss.mean().backward()
-                if self.use_grad_clip:  # Trick 7: Gradient clip
-                    torch.nn.utils.clip_grad_norm_(self.actor.parameters(), 0.5)
-                self.optimizer_actor.step()
-
-                v_s = self.critic(s[index])
-                critic_loss = F.mse_loss(v_target[index], v_s)
-                # Update critic
-                self.optimizer_critic.zero_grad()
-                critic_loss.backward()
-                #######打印几个loss看下
-                rd = random.randint(0, 100)
-                if rd == 5: print('loss:', critic_loss)
-                ########
-                if self.use_grad_clip:  # Trick 7: Gradient clip
-                    torch.nn.utils.clip_grad_norm_(self.critic.parameters(), 0.5)
-                self.optimizer_critic.step()
+                v_s = self.critic(s_b)
+                critic_loss = F.mse_loss(v_target_b, v_s)
+
+                if self.use_fused_update:
+                    # 合并的 loss 只做一次反向传播和一次优化器更新
+                    loss = actor_loss.mean() + self.value_coef * critic_loss
+                    self.optimizer.zero_grad()
+                    loss.backward()
+                    if self.use_grad_clip:  # Trick 7: Gradient clip
+                        torch.nn.utils.clip_grad_norm_(self.actor.parameters(), 0.5)
+                        torch.nn.utils.clip_grad_norm_(self.critic.parameters(), 0.5)
+                    self.optimizer.step()
+                else:
+                    # Update actor
+                    self.optimizer_actor.zero_grad()
+                    actor_loss.mean().backward()
+                    if self.use_grad_clip:  # Trick 7: Gradient clip
+                        torch.nn.utils.clip_grad_norm_(self.actor.parameters(), 0.5)
+                    self.optimizer_actor.step()
+
+                    # Update critic
+                    self.optimizer_critic.zero_grad()
+                    critic_loss.backward()
+                    if self.use_grad_clip:  # Trick 7: Gradient clip
+                        torch.nn.utils.clip_grad_norm_(self.critic.parameters(), 0.5)
+                    self.optimizer_critic.step()
+
+                metrics += torch.stack([actor_loss.detach().mean(), critic_loss.detach(), dist_entropy.detach().mean()])
+                num_minibatches += 1
+        self.metrics = dict(zip(('actor_loss', 'critic_loss', 'entropy'), (metrics / num_minibatches).tolist()))
 
         if self.use_lr_decay:  # Trick 6:learning rate Decay
             lr_a_now, lr_c_now = self.lr_decay(total_steps)
@@ -223,10 +375,14 @@ class PPO_continuous():
     def lr_decay(self, total_steps):
         lr_a_now = self.lr_a * (1 - total_steps / self.max_train_steps)
         lr_c_now = self.lr_c * (1 - total_steps / self.max_train_steps)
-        for p in self.optimizer_actor.param_groups:
+        if self.use_fused_update:
+            actor_groups, critic_groups = self.optimizer.param_groups[:1], self.optimizer.param_groups[1:]
+        else:
+            actor_groups, critic_groups = self.optimizer_actor.param_groups, self.optimizer_critic.param_groups
+        for p in actor_groups:
             p['lr'] = lr_a_now
             logger.info('调整actor的学习率为：{}', lr_a_now)
-        for p in self.optimizer_critic.param_groups:
+        for p in critic_groups:
             p['lr'] = lr_c_now
             logger.info('调整critic的学习率为：{}', lr_a_now)
         return lr_a_now, lr_c_now
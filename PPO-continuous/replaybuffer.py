@@ -33,3 +33,38 @@ class ReplayBuffer:
         done = torch.tensor(self.done, dtype=torch.float)
 
         return s, a, a_logprob, r, s_, dw, done
+
+
+# 向量化环境的轨迹存储：float32 张量 (T, N, dim) 一次分配，每步整批写入 N 个环境的转移
+class RolloutStorage:
+    def __init__(self, args, num_envs, num_steps=None):
+        self.num_envs = num_envs
+        self.num_steps = args.batch_size // num_envs if num_steps is None else num_steps
+        shape = (self.num_steps, num_envs)
+        self.s = torch.zeros(shape + (args.state_dim,))
+        self.a = torch.zeros(shape + (args.action_dim,))
+        self.a_logprob = torch.zeros(shape + (args.action_dim,))
+        self.r = torch.zeros(shape + (1,))
+        self.s_ = torch.zeros(shape + (args.state_dim,))
+        self.dw = torch.zeros(shape + (1,))
+        self.done = torch.zeros(shape + (1,))
+        self.count = 0
+
+    @staticmethod
+    def _write(buffer, x):
+        buffer.copy_(torch.as_tensor(x).reshape(buffer.shape))
+
+    # 每个参数都是 N 个环境的一批数据，如 s 为 (N, state_dim)，r/dw/done 为 (N,)
+    def store(self, s, a, a_logprob, r, s_, dw, done):
+        for buffer, x in zip((self.s, self.a, self.a_logprob, self.r, self.s_, self.dw, self.done),
+                             (s, a, a_logprob, r, s_, dw, done)):
+            self._write(buffer[self.count], x)
+        self.count += 1
+
+    # 与 ReplayBuffer 同名的接口，但直接返回 (T, N, dim) 的存储张量，不拷贝
+    def numpy_to_tensor(self):
+        return self.s, self.a, self.a_logprob, self.r, self.s_, self.dw, self.done
+
+    # 展平成 (T * N, dim) 的视图，供按转移采样 minibatch
+    def flat(self):
+        return tuple(x.view(-1, x.shape[-1]) for x in self.numpy_to_tensor())
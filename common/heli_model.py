@@ -0,0 +1,151 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
+import math
+from collections import namedtuple
+from dataclasses import dataclass
+
+import numpy as np
+
+'''化简后的3自由度直升机模型：与 nonlinearheli 同一组方程，常数在构造时折叠，每个状态的三角函数只算一次'''
+
+
+@dataclass(frozen=True)
+class HeliParams:
+    # Propeller force-thrust constant found experimentally (N/V)
+    Kf: float = 0.1188
+    # Mass of the helicopter body (kg)，前后两个螺旋桨组件各占一半
+    mh: float = 1.308
+    # Mass of counter-weight (kg)
+    mw: float = 1.924
+    # Distance between pitch pivot and each motor (m)
+    Lh: float = 7.0 * 0.0254
+    # Distance between elevation pivot to helicopter body (m)
+    La: float = 26.0 * 0.0254
+    # Distance between elevation pivot to counter-weight (m)
+    Lw: float = 18.5 * 0.0254
+    # Gravitational Constant (m/s**2)
+    g: float = 9.81
+
+
+# 折叠后的常数：
+# A = La²mh + Lw²mw（机体+配重绕升降轴），B = Lh²mh（绕俯仰轴），J = A + B
+HeliConstants = namedtuple('HeliConstants', [
+    'G',  # g(La·mh - Lw·mw)：重力力矩
+    'KfLa',  # 电压和 -> 升降力矩
+    'KfLh',  # 电压差 -> 俯仰力矩
+    'inv_A', 'inv_B', 'inv_J',
+    'BAJ',  # B / (A·J)
+    'p',  # B / J
+    'q',  # A / J
+])
+
+
+# 只用四则运算，参数是 float 或 torch 张量都可以
+def fold_constants(params):
+    p = params
+    A = p.La ** 2 * p.mh + p.Lw ** 2 * p.mw
+    B = p.Lh ** 2 * p.mh
+    J = A + B
+    return HeliConstants(
+        G=p.g * (p.La * p.mh - p.Lw * p.mw),
+        KfLa=p.Kf * p.La,
+        KfLh=p.Kf * p.Lh,
+        inv_A=1.0 / A,
+        inv_B=1.0 / B,
+        inv_J=1.0 / J,
+        BAJ=B / (A * J),
+        p=B / J,
+        q=A / J,
+    )
+
+
+# 三个角加速度。s0/c0、s1/c1 是升降角、俯仰角的 sin/cos；x3..x5 是角速度；u0/u1 是前后电机电压
+# 只用四则运算，float、numpy 数组和 torch 张量都适用
+def accelerations(k, s0, c0, s1, c1, x3, x4, x5, u0, u1):
+    inv_c0 = 1.0 / c0
+    inv_c0_sq = inv_c0 * inv_c0
+    c1_sq = c1 * c1
+    s1_sq = s1 * s1
+    s1c1 = s1 * c1
+    p2 = 2.0 * k.p
+    F = k.G + k.KfLa * (u0 + u1)  # 升降方向的净力矩
+    T = k.KfLh * (u1 - u0)  # 俯仰方向的力矩
+    W = k.BAJ * s1c1 * (F * (c0 + c1) - k.G * c0 * c0) - F * s1 * k.inv_A
+    R = k.BAJ * c1_sq - k.inv_A
+    w = x4 + s0 * x5
+
+    epsilon_ddot = (F - k.G * c0) * k.inv_J + k.BAJ * inv_c0 * (
+            F * c1 * (c0 * c1 - s1_sq) - k.G * c0 * c0 * c1_sq - T * s0 * s1c1) \
+        - p2 * s1c1 * x3 * w + p2 * c0 * s1_sq * x4 * x5 - x5 * x5 * s0 * c0 * (1.0 - p2 * s1_sq)
+    rho_ddot = x3 * x3 * s1c1 + p2 * x3 * x4 * s0 * c1_sq * inv_c0 \
+        + 2.0 * x3 * x5 * (k.q * c0 * c1_sq + (k.p * c1_sq - 1.0) * inv_c0) \
+        - p2 * x4 * x5 * s0 * s1c1 - x5 * x5 * s1c1 * ((1.0 - p2) * c0 * c0 + p2) \
+        + s0 * W * inv_c0_sq + T * R * s0 * s0 * inv_c0_sq - T * k.inv_B
+    lambda_ddot = -p2 * x3 * c1_sq * w * inv_c0 + 2.0 * x3 * x5 * s0 * inv_c0 + p2 * s1c1 * x5 * w \
+        - W * inv_c0_sq - T * s0 * R * inv_c0_sq
+    return epsilon_ddot, rho_ddot, lambda_ddot
+
+
+class HeliModel:
+    def __init__(self, params=HeliParams()):
+        self.params = params
+        self.constants = fold_constants(params)
+
+    # 单个状态：X 6个状态，U 2个电压 -> DERX（list，与 nonlinearheli 的第二个返回值一致）
+    def derivatives(self, X, U):
+        e, r = X[0], X[1]
+        acc = accelerations(self.constants, math.sin(e), math.cos(e), math.sin(r), math.cos(r),
+                            X[3], X[4], X[5], U[0], U[1])
+        return [X[3], X[4], X[5], *acc]
+
+    # N个状态：X (N, 6)，U (N, 2) 或 (2,) -> DERX (N, 6)
+    def derivatives_batch(self, X, U):
+        X = np.asarray(X, dtype=np.float64)
+        U = np.asarray(U, dtype=np.float64)
+        sin = np.sin(X[:, :2])
+        cos = np.cos(X[:, :2])
+        acc = accelerations(self.constants, sin[:, 0], cos[:, 0], sin[:, 1], cos[:, 1],
+                            X[:, 3], X[:, 4], X[:, 5], U[..., 0], U[..., 1])
+        DERX = np.empty_like(X)
+        DERX[:, :3] = X[:, 3:]
+        DERX[:, 3], DERX[:, 4], DERX[:, 5] = acc
+        return DERX
+
+    # 积分器使用的导数函数：(6,) 走 math 标量路径，(N, 6) 走批量路径
+    def __call__(self, X, U):
+        if X.ndim == 1:
+            return np.array(self.derivatives(X.tolist(), U.tolist()))
+        return self.derivatives_batch(X, U)
+
+
+# 默认参数的模型
+HELI_MODEL = HeliModel()
+
+if __name__ == '__main__':
+    import time
+    from common.helicopter_nonlinear_function import nonlinearheli, nonlinearheli_batch
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(-1.2, 1.2, (10000, 3)), rng.uniform(-2, 2, (10000, 3))])
+    U = rng.uniform(-10, 10, (10000, 2))
+
+    ref = nonlinearheli_batch(X, U)
+    err = np.abs(HELI_MODEL.derivatives_batch(X, U) - ref).max()
+    print('batch max abs diff vs nonlinearheli: {:.3e}'.format(err))
+    assert err < 1e-12
+    err = max(np.abs(np.subtract(HELI_MODEL.derivatives(x, u), nonlinearheli(x, u)[1])).max()
+              for x, u in zip(X[:1000].tolist(), U[:1000].tolist()))
+    print('scalar max abs diff vs nonlinearheli: {:.3e}'.format(err))
+    assert err < 1e-12
+
+    xs, us = X[:1000].tolist(), U[:1000].tolist()
+    for name, fn in [('nonlinearheli', lambda x, u: nonlinearheli(x, u)),
+                     ('HeliModel.derivatives', HELI_MODEL.derivatives)]:
+        t = time.perf_counter()
+        for x, u in zip(xs, us):
+            fn(x, u)
+        print('{:<24} {:.2f} us/call'.format(name, (time.perf_counter() - t) / len(xs) * 1e6))
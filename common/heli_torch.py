@@ -0,0 +1,112 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
+from dataclasses import fields
+
+import torch
+import torch.nn as nn
+
+from common.heli_model import HeliParams, accelerations, fold_constants
+from common.integrators import INTEGRATORS
+
+'''torch 版本的直升机模型：批量张量、支持自动求导（策略梯度/系统辨识），torch.no_grad 下可做快速批量仿真'''
+
+
+class TorchHeliModel(nn.Module):
+    # learnable=True 时物理参数是 nn.Parameter，可用于系统辨识；否则是 buffer
+    def __init__(self, params=HeliParams(), learnable=False, dtype=torch.float64):
+        super(TorchHeliModel, self).__init__()
+        self.param_names = [f.name for f in fields(params)]
+        for name in self.param_names:
+            value = torch.tensor(getattr(params, name), dtype=dtype)
+            if learnable:
+                self.register_parameter(name, nn.Parameter(value))
+            else:
+                self.register_buffer(name, value)
+
+    def params(self):
+        return HeliParams(**{name: getattr(self, name) for name in self.param_names})
+
+    # X (N, 6)，U (N, 2) 或 (2,) -> DERX (N, 6)
+    def forward(self, X, U):
+        k = fold_constants(self.params())
+        sin = torch.sin(X[..., :2])
+        cos = torch.cos(X[..., :2])
+        acc = accelerations(k, sin[..., 0], cos[..., 0], sin[..., 1], cos[..., 1],
+                            X[..., 3], X[..., 4], X[..., 5], U[..., 0], U[..., 1])
+        return torch.cat([X[..., 3:], torch.stack(acc, dim=-1)], dim=-1)
+
+    # 与 device_next_state 相同的接口：默认一个 0.001s 的欧拉步；给定 control_period 时在整个周期内积分
+    def step(self, Y, U, control_period=None, method='euler', timestep=0.001):
+        if method not in INTEGRATORS:
+            raise ValueError('torch model supports fixed-step methods {}, got {!r}'.format(list(INTEGRATORS), method))
+        period = timestep if control_period is None else control_period
+        n = max(1, int(round(period / timestep)))
+        h = period / n
+        step = INTEGRATORS[method]
+        for _ in range(n):
+            Y = step(self, Y, U, h)
+        return Y
+
+    # 给定初始状态 Y0 (N, 6) 和电压序列 U (T, N, 2)，返回轨迹 (T + 1, N, 6)
+    def rollout(self, Y0, U, control_period=0.1, method='rk4', timestep=0.01):
+        states = [Y0]
+        for u in U:
+            states.append(self.step(states[-1], u, control_period, method, timestep))
+        return torch.stack(states)
+
+
+# 与 device_next_state 对应的函数接口；不传 model 时使用按 dtype/device 缓存的默认参数模型
+def device_next_state_torch(Y, U, control_period=None, method='euler', timestep=0.001, model=None):
+    if model is None:
+        model = _default_model(Y.dtype, Y.device)
+    return model.step(Y, U, control_period, method, timestep)
+
+
+_DEFAULT_MODELS = {}
+
+
+def _default_model(dtype, device):
+    key = (dtype, device)
+    if key not in _DEFAULT_MODELS:
+        _DEFAULT_MODELS[key] = TorchHeliModel(dtype=dtype).to(device)
+    return _DEFAULT_MODELS[key]
+
+
+if __name__ == '__main__':
+    import time
+    import numpy as np
+    from common.heli_model import HELI_MODEL
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(-1.2, 1.2, (4096, 3)), rng.uniform(-2, 2, (4096, 3))])
+    U = rng.uniform(-10, 10, (4096, 2))
+    model = TorchHeliModel()
+    err = (model(torch.from_numpy(X), torch.from_numpy(U)).numpy() - HELI_MODEL.derivatives_batch(X, U))
+    print('max abs diff vs HeliModel: {:.3e}'.format(np.abs(err).max()))
+    assert np.abs(err).max() < 1e-12
+
+    # 系统辨识示例：从扰动后的 Kf 出发，用轨迹误差的梯度把它拉回真实值
+    Y0 = torch.zeros(16, 6, dtype=torch.float64)
+    U_seq = torch.from_numpy(rng.uniform(1.5, 3.0, (10, 16, 2)))
+    with torch.no_grad():
+        target = model.rollout(Y0, U_seq, timestep=0.05)
+    fit = TorchHeliModel(HeliParams(Kf=0.09), learnable=True)
+    optimizer = torch.optim.Adam([fit.Kf], lr=2e-3)
+    for _ in range(50):
+        loss = (fit.rollout(Y0, U_seq, timestep=0.05) - target).pow(2).mean()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    print('identified Kf={:.4f} (true {:.4f})'.format(fit.Kf.item(), HeliParams().Kf))
+
+    with torch.no_grad():
+        Y = torch.zeros(4096, 6, dtype=torch.float32)
+        u = torch.full((4096, 2), 2.0)
+        t = time.perf_counter()
+        for _ in range(100):
+            Y = device_next_state_torch(Y, u, 0.1, 'rk4', 0.05)
+        print('{:.0f} env-steps/s (float32, rk4, 0.1s period)'.format(4096 * 100 / (time.perf_counter() - t)))
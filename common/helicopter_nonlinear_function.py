@@ -1,11 +1,22 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
 import math
 
+import numpy as np
 from matplotlib import pyplot as plt
 
+from common.heli_model import HELI_MODEL
+from common.integrators import integrate
+
 '''旋翼装置状态计算器'''
 
 
-def nonlinearheli(X, U):
+def nonlinearheli(X, U, m=math):
+    # m: 提供 sin/cos 的模块，默认 math 逐个标量计算；传入 numpy 时 X[i]、U[i] 可以是等长数组
     # Propeller force-thrust constant found experimentally (N/V)
     Kf = 0.1188
     # Mass of the helicopter body (kg)
@@ -30,141 +41,141 @@ def nonlinearheli(X, U):
     rho_dot = X[4]  # pitch
     lambda_dot = X[5]  # travel 角速度
 
-    epsilon_ddot = -math.cos(X[1]) ** 2 * Lh * (mf - mb) * La * math.sin(X[1]) / (
+    epsilon_ddot = -m.cos(X[1]) ** 2 * Lh * (mf - mb) * La * m.sin(X[1]) / (
             (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[3] ** 2 + (
-                           -0.2e1 * Lh * math.cos(X[1]) * (
-                           math.cos(X[0]) * La * (mf - mb) * math.cos(X[1]) ** 2 - math.cos(X[0]) * La * (
-                           mf - mb) + math.sin(X[1]) * math.sin(X[0]) * Lh * (mf + mb)) / (
+                           -0.2e1 * Lh * m.cos(X[1]) * (
+                           m.cos(X[0]) * La * (mf - mb) * m.cos(X[1]) ** 2 - m.cos(X[0]) * La * (
+                           mf - mb) + m.sin(X[1]) * m.sin(X[0]) * Lh * (mf + mb)) / (
                                    (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[
-                               5] - 0.2e1 * (mf + mb) * math.cos(X[1]) * Lh ** 2 * math.sin(X[1]) * X[4] / (
+                               5] - 0.2e1 * (mf + mb) * m.cos(X[1]) * Lh ** 2 * m.sin(X[1]) * X[4] / (
                                    (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw)) * X[3] + (
-                           (math.sin(X[1]) * La * (mf - mb) * math.cos(X[0]) - 0.2e1 * math.sin(X[0]) * Lh * (
-                                   mf + mb)) * Lh * math.cos(X[0]) * math.cos(X[1]) ** 2 - 0.2e1 * math.sin(
-                       X[1]) * La * Lh * (mf - mb) * math.cos(X[0]) ** 2 - math.sin(X[0]) * (
-                                   (mf + mb) * La ** 2 - Lh ** 2 * mb - Lh ** 2 * mf + Lw ** 2 * mw) * math.cos(
-                       X[0]) + math.sin(X[1]) * La * Lh * (mf - mb)) / (
+                           (m.sin(X[1]) * La * (mf - mb) * m.cos(X[0]) - 0.2e1 * m.sin(X[0]) * Lh * (
+                                   mf + mb)) * Lh * m.cos(X[0]) * m.cos(X[1]) ** 2 - 0.2e1 * m.sin(
+                       X[1]) * La * Lh * (mf - mb) * m.cos(X[0]) ** 2 - m.sin(X[0]) * (
+                                   (mf + mb) * La ** 2 - Lh ** 2 * mb - Lh ** 2 * mf + Lw ** 2 * mw) * m.cos(
+                       X[0]) + m.sin(X[1]) * La * Lh * (mf - mb)) / (
                            (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[
                        5] ** 2 - 0.2e1 * Lh * (
-                           math.cos(X[0]) * Lh * (mf + mb) * math.cos(X[1]) ** 2 - math.cos(X[0]) * Lh * (
-                           mf + mb) - math.sin(X[1]) * math.sin(X[0]) * La * (mf - mb)) * X[4] / (
+                           m.cos(X[0]) * Lh * (mf + mb) * m.cos(X[1]) ** 2 - m.cos(X[0]) * Lh * (
+                           mf + mb) - m.sin(X[1]) * m.sin(X[0]) * La * (mf - mb)) * X[4] / (
                            (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[5] + Lh * (
-                           mf - mb) * La * math.sin(X[1]) / (
+                           mf - mb) * La * m.sin(X[1]) / (
                            (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[4] ** 2 + (
                            ((g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * (
-                           (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * math.cos(X[1]) ** 3 + (g * (
+                           (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * m.cos(X[1]) ** 3 + (g * (
                            mw * Lw * (mf - mb) ** 2 * La ** 2 + (
                            (-0.4e1 * Lh ** 2 * mf + Lw ** 2 * mw) * mb ** 2 + (
                            -0.4e1 * Lh ** 2 * mf ** 2 - 0.2e1 * Lw ** 2 * mw * mf) * mb + mf ** 2 * mw * Lw ** 2) * La + mw * Lh ** 2 * Lw * (
-                                   mf + mb) ** 2) * math.cos(X[0]) + ((g * mb + g * mf + Kf * (
+                                   mf + mb) ** 2) * m.cos(X[0]) + ((g * mb + g * mf + Kf * (
                            U[0] + U[1])) * La - Lw * mw * g) * ((mf - mb) ** 2 * La ** 2 + Lh ** 2 * (
-                           mf + mb) ** 2)) * math.cos(X[0]) * math.cos(X[1]) ** 2 + (
+                           mf + mb) ** 2)) * m.cos(X[0]) * m.cos(X[1]) ** 2 + (
                                    Kf * (-U[0] + U[1]) * (mf - mb) * ((
-                                                                              mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * La * math.cos(
-                               X[0]) - (math.sin(X[0]) * Kf * Lh * (-U[0] + U[1]) * math.sin(X[1]) + (
+                                                                              mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * La * m.cos(
+                               X[0]) - (m.sin(X[0]) * Kf * Lh * (-U[0] + U[1]) * m.sin(X[1]) + (
                                    g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * (
-                                           (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2)) * math.cos(
-                       X[1]) + (0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) * math.cos(X[0]) * (
-                                   -g * ((mf + mb) * La - Lw * mw) * math.cos(X[0]) + g * math.sin(
-                               X[0]) * Lh * (mf - mb) * math.sin(X[1]) + (
+                                           (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2)) * m.cos(
+                       X[1]) + (0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) * m.cos(X[0]) * (
+                                   -g * ((mf + mb) * La - Lw * mw) * m.cos(X[0]) + g * m.sin(
+                               X[0]) * Lh * (mf - mb) * m.sin(X[1]) + (
                                            g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g)) / (
                            0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) / (
-                           (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) / math.cos(X[0])
-    rho_ddot = math.cos(X[1]) * (
-            ((mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * math.sin(X[1]) * math.cos(X[0]) + math.cos(
-        X[1]) ** 2 * math.sin(X[0]) * La * Lh * (mf - mb)) / math.cos(X[0]) / (
+                           (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) / m.cos(X[0])
+    rho_ddot = m.cos(X[1]) * (
+            ((mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * m.sin(X[1]) * m.cos(X[0]) + m.cos(
+        X[1]) ** 2 * m.sin(X[0]) * La * Lh * (mf - mb)) / m.cos(X[0]) / (
                        (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * X[3] ** 2 + (-0.2e1 * (
-            -math.cos(X[1]) ** 2 * ((mf + mb) * La ** 2 + Lw ** 2 * mw) * math.cos(X[0]) ** 2 + math.cos(
-        X[1]) ** 2 * math.sin(X[1]) * math.sin(X[0]) * La * Lh * (mf - mb) * math.cos(X[0]) - Lh ** 2 * (
-                    mf + mb) * math.cos(X[1]) ** 2 + (mf + mb) * Lh ** 2 + (
-                    mf + mb) * La ** 2 + Lw ** 2 * mw) / math.cos(X[0]) / ((mf + mb) * Lh ** 2 + (
-            mf + mb) * La ** 2 + Lw ** 2 * mw) * X[5] + 0.2e1 * (mf + mb) * math.cos(
-        X[1]) ** 2 * Lh ** 2 * math.sin(X[0]) * X[4] / math.cos(X[0]) / ((mf + mb) * Lh ** 2 + (
-            mf + mb) * La ** 2 + Lw ** 2 * mw)) * X[3] - math.cos(X[1]) * (
-                       ((-mb - mf) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * math.sin(X[1]) * math.cos(
-                   X[0]) ** 3 + math.sin(X[0]) * La * Lh * (math.cos(X[1]) ** 2 - 0.2e1) * (mf - mb) * math.cos(
-                   X[0]) ** 2 + 0.2e1 * math.sin(X[1]) * Lh ** 2 * (mf + mb) * math.cos(X[0]) + math.sin(
-                   X[0]) * La * Lh * (mf - mb)) / math.cos(X[0]) / (
+            -m.cos(X[1]) ** 2 * ((mf + mb) * La ** 2 + Lw ** 2 * mw) * m.cos(X[0]) ** 2 + m.cos(
+        X[1]) ** 2 * m.sin(X[1]) * m.sin(X[0]) * La * Lh * (mf - mb) * m.cos(X[0]) - Lh ** 2 * (
+                    mf + mb) * m.cos(X[1]) ** 2 + (mf + mb) * Lh ** 2 + (
+                    mf + mb) * La ** 2 + Lw ** 2 * mw) / m.cos(X[0]) / ((mf + mb) * Lh ** 2 + (
+            mf + mb) * La ** 2 + Lw ** 2 * mw) * X[5] + 0.2e1 * (mf + mb) * m.cos(
+        X[1]) ** 2 * Lh ** 2 * m.sin(X[0]) * X[4] / m.cos(X[0]) / ((mf + mb) * Lh ** 2 + (
+            mf + mb) * La ** 2 + Lw ** 2 * mw)) * X[3] - m.cos(X[1]) * (
+                       ((-mb - mf) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * m.sin(X[1]) * m.cos(
+                   X[0]) ** 3 + m.sin(X[0]) * La * Lh * (m.cos(X[1]) ** 2 - 0.2e1) * (mf - mb) * m.cos(
+                   X[0]) ** 2 + 0.2e1 * m.sin(X[1]) * Lh ** 2 * (mf + mb) * m.cos(X[0]) + m.sin(
+                   X[0]) * La * Lh * (mf - mb)) / m.cos(X[0]) / (
                        (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * X[
-                   5] ** 2 - 0.2e1 * Lh * math.cos(X[1]) * (
-                       -La * (mf - mb) * math.cos(X[0]) ** 2 + math.sin(X[1]) * math.sin(X[0]) * Lh * (
-                       mf + mb) * math.cos(X[0]) + La * (mf - mb)) * X[4] / math.cos(X[0]) / (
-                       (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * X[5] - math.cos(
-        X[1]) * Lh * math.sin(X[0]) * (mf - mb) * La / math.cos(X[0]) / (
+                   5] ** 2 - 0.2e1 * Lh * m.cos(X[1]) * (
+                       -La * (mf - mb) * m.cos(X[0]) ** 2 + m.sin(X[1]) * m.sin(X[0]) * Lh * (
+                       mf + mb) * m.cos(X[0]) + La * (mf - mb)) * X[4] / m.cos(X[0]) / (
+                       (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * X[5] - m.cos(
+        X[1]) * Lh * m.sin(X[0]) * (mf - mb) * La / m.cos(X[0]) / (
                        (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * X[4] ** 2 + (
-                       -g * math.cos(X[1]) * (mf - mb) * (
+                       -g * m.cos(X[1]) * (mf - mb) * (
                        (-0.4e1 * La * mb * mf + mw * Lw * (mf + mb)) * La * Lh ** 2 + Lw * (
-                       (mf + mb) * La ** 2 + Lw ** 2 * mw) * (La + Lw) * mw) * math.cos(X[0]) ** 3 + (
+                       (mf + mb) * La ** 2 + Lw ** 2 * mw) * (La + Lw) * mw) * m.cos(X[0]) ** 3 + (
                                -Lh ** 2 * Kf * (-U[0] + U[1]) * (
-                               (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * math.cos(
-                           X[1]) ** 2 + (g * Lh * math.sin(X[0]) * ((mf + mb) * (
+                               (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * m.cos(
+                           X[1]) ** 2 + (g * Lh * m.sin(X[0]) * ((mf + mb) * (
                                -0.4e1 * La * mb * mf + mw * Lw * (mf + mb)) * Lh ** 2 + Lw * La * mw * (
                                                                             mf - mb) ** 2 * (
-                                                                            La + Lw)) * math.sin(X[1]) - ((
+                                                                            La + Lw)) * m.sin(X[1]) - ((
                                                                                                                   g * mb + g * mf + Kf * (
                                                                                                                   U[
                                                                                                                       0] +
                                                                                                                   U[
                                                                                                                       1])) * La - Lw * mw * g) * (
                                                  mf - mb) * ((mf + mb) * Lh ** 2 + (
-                               mf + mb) * La ** 2 + Lw ** 2 * mw) * La) * math.cos(X[1]) - Kf * (
+                               mf + mb) * La ** 2 + Lw ** 2 * mw) * La) * m.cos(X[1]) - Kf * (
                                        -U[0] + U[1]) * (
                                        (-mb - mf) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * (
                                        (mf + mb) * Lh ** 2 + (
-                                       mf + mb) * La ** 2 + Lw ** 2 * mw)) * math.cos(X[0]) ** 2 + (
+                                       mf + mb) * La ** 2 + Lw ** 2 * mw)) * m.cos(X[0]) ** 2 + (
                                -((g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * (mf - mb) * (
-                               (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * La * math.cos(
+                               (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) * La * m.cos(
                            X[1]) ** 2 + Lh * (((g * mb + g * mf + Kf * (
-                               U[0] + U[1])) * La - Lw * mw * g) * math.sin(X[0]) * (
+                               U[0] + U[1])) * La - Lw * mw * g) * m.sin(X[0]) * (
                                                       (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (
-                                                      mf + mb) ** 2) * math.sin(X[1]) - g * Lh * (
+                                                      mf + mb) ** 2) * m.sin(X[1]) - g * Lh * (
                                                       0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (
-                                                      mf + mb)) * (mf - mb)) * math.cos(X[1]) + (
-                                       0.2e1 * math.sin(X[0]) * Kf * Lh * (-U[0] + U[1]) * math.sin(
+                                                      mf + mb)) * (mf - mb)) * m.cos(X[1]) + (
+                                       0.2e1 * m.sin(X[0]) * Kf * Lh * (-U[0] + U[1]) * m.sin(
                                    X[1]) + (g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * (
                                        mf - mb) * ((mf + mb) * Lh ** 2 + (
-                               mf + mb) * La ** 2 + Lw ** 2 * mw) * La) * math.cos(X[0]) + Lh * (
-                               ((g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * math.sin(
-                           X[0]) * math.sin(X[1]) + Kf * Lh * (-U[0] + U[1])) * (
-                               ((mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * math.cos(X[1]) ** 2 - (
+                               mf + mb) * La ** 2 + Lw ** 2 * mw) * La) * m.cos(X[0]) + Lh * (
+                               ((g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * m.sin(
+                           X[0]) * m.sin(X[1]) + Kf * Lh * (-U[0] + U[1])) * (
+                               ((mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * m.cos(X[1]) ** 2 - (
                                mf + mb) * (
                                        (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw))) / Lh / (
                        0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) / (
-                       (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) / math.cos(X[0]) ** 2
-    lambda_ddot = -math.cos(X[1]) ** 3 * Lh * (mf - mb) * La / math.cos(X[0]) / (
+                       (mf + mb) * Lh ** 2 + (mf + mb) * La ** 2 + Lw ** 2 * mw) / m.cos(X[0]) ** 2
+    lambda_ddot = -m.cos(X[1]) ** 3 * Lh * (mf - mb) * La / m.cos(X[0]) / (
             (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[3] ** 2 + (0.2e1 * (
-            Lh * (math.sin(X[1]) * La * (mf - mb) * math.cos(X[0]) - math.sin(X[0]) * Lh * (mf + mb)) * math.cos(
-        X[1]) ** 2 + math.sin(X[0]) * (
-                    (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw)) / math.cos(X[0]) / ((
+            Lh * (m.sin(X[1]) * La * (mf - mb) * m.cos(X[0]) - m.sin(X[0]) * Lh * (mf + mb)) * m.cos(
+        X[1]) ** 2 + m.sin(X[0]) * (
+                    (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw)) / m.cos(X[0]) / ((
                                                                                                                    mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) *
                                                                                              X[5] - 0.2e1 * (
-                                                                                                     mf + mb) * math.cos(
-                X[1]) ** 2 * Lh ** 2 * X[4] / math.cos(X[0]) / ((
+                                                                                                     mf + mb) * m.cos(
+                X[1]) ** 2 * Lh ** 2 * X[4] / m.cos(X[0]) / ((
                                                                         mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw)) * \
-                  X[3] + math.cos(X[1]) * Lh * (
-                          La * (mf - mb) * math.cos(X[0]) ** 2 * math.cos(X[1]) ** 2 + 0.2e1 * math.sin(
-                      X[1]) * math.sin(X[0]) * Lh * (mf + mb) * math.cos(X[0]) - 0.2e1 * (mf - mb) * (
-                                  math.cos(X[0]) ** 2 - 0.1e1 / 0.2e1) * La) / math.cos(X[0]) / (
+                  X[3] + m.cos(X[1]) * Lh * (
+                          La * (mf - mb) * m.cos(X[0]) ** 2 * m.cos(X[1]) ** 2 + 0.2e1 * m.sin(
+                      X[1]) * m.sin(X[0]) * Lh * (mf + mb) * m.cos(X[0]) - 0.2e1 * (mf - mb) * (
+                                  m.cos(X[0]) ** 2 - 0.1e1 / 0.2e1) * La) / m.cos(X[0]) / (
                           (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[5] ** 2 + 0.2e1 * (
-                          math.cos(X[0]) * Lh * (mf + mb) * math.sin(X[1]) + math.sin(X[0]) * La * (
-                          mf - mb)) * math.cos(X[1]) * Lh * X[4] / math.cos(X[0]) / (
-                          (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[5] + math.cos(
-        X[1]) * Lh * (mf - mb) * La / math.cos(X[0]) / (
+                          m.cos(X[0]) * Lh * (mf + mb) * m.sin(X[1]) + m.sin(X[0]) * La * (
+                          mf - mb)) * m.cos(X[1]) * Lh * X[4] / m.cos(X[0]) / (
+                          (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[5] + m.cos(
+        X[1]) * Lh * (mf - mb) * La / m.cos(X[0]) / (
                           (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) * X[4] ** 2 + (-(
-            ((g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * math.sin(X[1]) + math.sin(
-        X[0]) * Kf * Lh * (-U[0] + U[1])) * ((mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * math.cos(
+            ((g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * m.sin(X[1]) + m.sin(
+        X[0]) * Kf * Lh * (-U[0] + U[1])) * ((mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2) * m.cos(
         X[1]) ** 2 - ((g * (mw * Lw * (mf - mb) ** 2 * La ** 2 + ((-0.4e1 * Lh ** 2 * mf + Lw ** 2 * mw) * mb ** 2 + (
             -0.4e1 * Lh ** 2 * mf ** 2 - 0.2e1 * Lw ** 2 * mw * mf) * mb + mf ** 2 * mw * Lw ** 2) * La + mw * Lh ** 2 * Lw * (
-                                    mf + mb) ** 2) * math.cos(X[0]) + (
+                                    mf + mb) ** 2) * m.cos(X[0]) + (
                                (g * mb + g * mf + Kf * (U[0] + U[1])) * La - Lw * mw * g) * (
-                               (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2)) * math.sin(
-        X[1]) - g * Lh * math.sin(X[0]) * (0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) * (
-                              mf - mb)) * math.cos(X[0]) * math.cos(X[1]) + ((-Kf * La * (-U[0] + U[1]) * (
-            mf - mb) * math.cos(X[0]) + (mf + mb) * ((g * mb + g * mf + Kf * (
-            U[0] + U[1])) * La - Lw * mw * g)) * math.sin(X[1]) + math.sin(X[0]) * Kf * Lh * (-U[0] + U[1]) * (
+                               (mf - mb) ** 2 * La ** 2 + Lh ** 2 * (mf + mb) ** 2)) * m.sin(
+        X[1]) - g * Lh * m.sin(X[0]) * (0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) * (
+                              mf - mb)) * m.cos(X[0]) * m.cos(X[1]) + ((-Kf * La * (-U[0] + U[1]) * (
+            mf - mb) * m.cos(X[0]) + (mf + mb) * ((g * mb + g * mf + Kf * (
+            U[0] + U[1])) * La - Lw * mw * g)) * m.sin(X[1]) + m.sin(X[0]) * Kf * Lh * (-U[0] + U[1]) * (
                                                                                      mf + mb)) * ((
                                                                                                           mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw)) / (
                           0.4e1 * La ** 2 * mb * mf + mw * Lw ** 2 * (mf + mb)) / (
-                          (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) / math.cos(X[0]) ** 2
+                          (mf + mb) * La ** 2 + Lh ** 2 * mb + Lh ** 2 * mf + Lw ** 2 * mw) / m.cos(X[0]) ** 2
 
     DERX = [X[3], X[4], X[5], epsilon_ddot, rho_ddot, lambda_ddot]
 
@@ -174,12 +185,37 @@ def nonlinearheli(X, U):
 
 
 # 装置的下一个状态计算：输入的6个状态 -> 下一个的6个状态
-def device_next_state(Y, U):
-    Y, DERX = nonlinearheli(Y, U)
-    # Y = Y + DERX * h; % h =0.1
-    timestep = 0.001
-    Y = [it2 + Y[i] for i, it2 in enumerate([item * timestep for item in DERX])]
-    return Y
+# 默认与原来一致：一个 0.001s 的欧拉步；给定 control_period 时按 method 在整个控制周期内积分
+def device_next_state(Y, U, control_period=None, method='euler', timestep=0.001):
+    if control_period is None and method == 'euler':
+        DERX = HELI_MODEL.derivatives(Y, U)  # 与 nonlinearheli 结果一致（误差<1e-12），常数已折叠
+        # Y = Y + DERX * h; % h =0.1
+        Y = [it2 + Y[i] for i, it2 in enumerate([item * timestep for item in DERX])]
+        return Y
+    period = timestep if control_period is None else control_period
+    return integrate(heli_derivatives, np.asarray(Y, dtype=np.float64), np.asarray(U, dtype=np.float64), period,
+                     method, timestep).tolist()
+
+
+# 批量计算N个装置的状态导数：X (N, 6)，U (N, 2) -> DERX (N, 6)
+def nonlinearheli_batch(X, U):
+    X = np.asarray(X, dtype=np.float64)
+    U = np.asarray(U, dtype=np.float64)
+    # 转置后 X[i] 是第i个状态分量的 (N,) 视图，公式与单个状态的版本完全相同
+    _, DERX = nonlinearheli(X.T, np.broadcast_to(U, (X.shape[0], 2)).T, m=np)
+    return np.stack(DERX, axis=1)
+
+
+# 积分器使用的导数函数：单个状态 (6,) 走 math 标量路径，(N, 6) 走批量路径
+def heli_derivatives(X, U):
+    return HELI_MODEL(X, U)
+
+
+# 批量版本的 device_next_state：Y (N, 6)，U (N, 2) -> 下一个状态 (N, 6)
+def device_next_state_batch(Y, U, control_period=None, method='euler', timestep=0.001):
+    Y = np.asarray(Y, dtype=np.float64)
+    period = timestep if control_period is None else control_period
+    return integrate(heli_derivatives, Y, np.asarray(U, dtype=np.float64), period, method, timestep)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,127 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
+import numpy as np
+
+'''积分器：f(x, u) 返回 dx/dt，x 为 (6,) 或 (N, 6) 的 [角度, 角速度] 数组，u 在一个控制周期内保持不变
+定步长方法只用四则运算，也可以直接用于 torch 张量'''
+
+
+def euler_step(f, x, u, h):
+    return x + h * f(x, u)
+
+
+# 先用加速度更新角速度，再用新的角速度更新角度（辛欧拉）
+# 角度 = x + h * (v + h * a)，即在欧拉步上再补 h² * a；只用切片原地加法，numpy 数组和 torch 张量都适用
+def semi_implicit_euler_step(f, x, u, h):
+    n = x.shape[-1] // 2
+    dx = f(x, u)
+    x_next = x + h * dx
+    x_next[..., :n] += h * h * dx[..., n:]
+    return x_next
+
+
+def rk4_step(f, x, u, h):
+    k1 = f(x, u)
+    k2 = f(x + 0.5 * h * k1, u)
+    k3 = f(x + 0.5 * h * k2, u)
+    k4 = f(x + h * k3, u)
+    return x + h / 6.0 * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+
+
+INTEGRATORS = {
+    'euler': euler_step,
+    'semi_implicit_euler': semi_implicit_euler_step,
+    'rk4': rk4_step,
+}
+
+# Dormand–Prince 5(4) 系数
+_DOPRI_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_DOPRI_B5 = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0)
+_DOPRI_B4 = (5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40)
+_DOPRI_E = tuple(b5 - b4 for b5, b4 in zip(_DOPRI_B5, _DOPRI_B4))
+
+
+# 自适应步长的 Dormand–Prince 积分，从 0 积分到 period；批量时按误差最大的一行控制步长
+def dopri5(f, x, u, period, timestep=0.001, rtol=1e-6, atol=1e-9, max_steps=10000):
+    t = 0.0
+    h = min(timestep, period)
+    k1 = f(x, u)
+    for _ in range(max_steps):
+        if t >= period:
+            return x
+        h = min(h, period - t)
+        k = [k1]
+        for a in _DOPRI_A[1:]:
+            k.append(f(x + h * sum(ai * ki for ai, ki in zip(a, k)), u))
+        x_new = x + h * sum(b * ki for b, ki in zip(_DOPRI_B5, k) if b)
+        k.append(f(x_new, u))  # FSAL：第7级即下一步的 k1
+        err = h * sum(e * ki for e, ki in zip(_DOPRI_E, k) if e)
+        scale = atol + rtol * np.maximum(np.abs(x), np.abs(x_new))
+        err_norm = np.max(np.sqrt(np.mean(np.square(err / scale), axis=-1)))
+        if err_norm <= 1.0:
+            t += h
+            x = x_new
+            k1 = k[-1]
+        factor = 5.0 if err_norm == 0 else min(5.0, max(0.2, 0.9 * err_norm ** -0.2))
+        h *= factor
+    raise RuntimeError('dopri5 exceeded max_steps={} before reaching period={}'.format(max_steps, period))
+
+
+# 在一个控制周期内积分：定步长方法把 period 均分为若干个不超过 timestep 的子步
+def integrate(f, x, u, period, method='euler', timestep=0.001):
+    if method == 'dopri5':
+        return dopri5(f, x, u, period, timestep=timestep)
+    step = INTEGRATORS[method]
+    n = max(1, int(round(period / timestep)))
+    h = period / n
+    for _ in range(n):
+        x = step(f, x, u, h)
+    return x
+
+
+if __name__ == '__main__':
+    # 参考精度测试：以 1e-5 步长的欧拉轨迹作为参考，比较各方法在 1s（10 个 0.1s 控制周期）后的误差
+    from common.helicopter_nonlinear_function import heli_derivatives
+
+    calls = [0]
+
+    def counted(x, u):
+        calls[0] += x.shape[0] if x.ndim > 1 else 1
+        return heli_derivatives(x, u)
+
+    rng = np.random.default_rng(0)
+    x0 = np.zeros((16, 6))
+    x0[:, 0] = rng.uniform(-10, 10, 16) / 180 * np.pi
+    x0[:, 1] = rng.uniform(-10, 10, 16) / 180 * np.pi
+    us = rng.uniform(1.5, 3.0, (10, 16, 2))
+    period = 0.1
+
+    ref = x0
+    for u in us:
+        ref = integrate(heli_derivatives, ref, u, period, 'euler', 1e-5)
+
+    for method, timestep in [('euler', 0.001), ('semi_implicit_euler', 0.001), ('rk4', 0.01), ('rk4', 0.05),
+                             ('dopri5', 0.01)]:
+        calls[0] = 0
+        x = x0
+        for u in us:
+            x = integrate(counted, x, u, period, method, timestep)
+        print('{:<20} timestep={:<6} max_err={:.3e} derivative_calls_per_period={:.0f}'.format(
+            method, timestep, np.abs(x - ref).max(), calls[0] / x0.shape[0] / len(us)))
+    # 参考轨迹本身的截断误差约为 1e-5 量级，高阶方法的误差应与之相当
+    calls[0] = 0
+    x = x0
+    for u in us:
+        x = integrate(counted, x, u, period, 'rk4', 0.05)
+    assert np.abs(x - ref).max() < 1e-4
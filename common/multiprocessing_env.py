@@ -3,28 +3,43 @@
 
 import numpy as np
 from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 
+def _step_env(env, action):
+    ob, reward, done, info = env.step(action)
+    if done:
+        ob = env.reset()
+    return ob, reward, done, info
+
+
+# 把 nenvs 个环境尽量均匀地分给 n_workers 个进程，返回每个进程负责的 [start, end)
+def chunk_bounds(nenvs, n_workers=None):
+    n_workers = nenvs if n_workers is None else max(1, min(n_workers, nenvs))
+    sizes = [len(c) for c in np.array_split(np.arange(nenvs), n_workers)]
+    ends = np.cumsum(sizes)
+    return [(int(end - size), int(end)) for size, end in zip(sizes, ends)]
+
+
+# 每个 worker 进程拥有一组环境，依次步进后把整组结果一次发回
 def worker(remote, parent_remote, env_fn_wrapper):
     parent_remote.close()
-    env = env_fn_wrapper.x()
+    envs = [env_fn() for env_fn in env_fn_wrapper.x]
     while True:
         cmd, data = remote.recv()
         if cmd == 'step':
-            ob, reward, done, info = env.step(data)
-            if done:
-                ob = env.reset()
-            remote.send((ob, reward, done, info))
+            obs, rews, dones, infos = zip(*[_step_env(env, action) for env, action in zip(envs, data)])
+            remote.send((np.stack(obs), np.stack(rews), np.stack(dones), infos))
         elif cmd == 'reset':
-            ob = env.reset()
-            remote.send(ob)
+            remote.send(np.stack([env.reset() for env in envs]))
         elif cmd == 'reset_task':
-            ob = env.reset_task()
-            remote.send(ob)
+            remote.send(np.stack([env.reset_task() for env in envs]))
         elif cmd == 'close':
             remote.close()
             break
         elif cmd == 'get_spaces':
-            remote.send((env.observation_space, env.action_space))
+            remote.send((envs[0].observation_space, envs[0].action_space))
         else:
             raise NotImplementedError
 
@@ -95,17 +110,25 @@ class CloudpickleWrapper(object):
 
         
 class SubprocVecEnv(VecEnv):
-    def __init__(self, env_fns, spaces=None):
+    def __init__(self, env_fns, spaces=None, n_workers=None, batch_size=None):
         """
         envs: list of gym environments to run in subprocesses
+        n_workers: number of subprocesses, each one steps a contiguous chunk
+                   of the envs; None means one subprocess per env
+        batch_size: default minimum number of envs returned by recv() in
+                    asynchronous mode; None means all of them
         """
         self.waiting = False
         self.closed = False
         nenvs = len(env_fns)
         self.nenvs = nenvs
-        self.remotes, self.work_remotes = zip(*[Pipe() for _ in range(nenvs)])
-        self.ps = [Process(target=worker, args=(work_remote, remote, CloudpickleWrapper(env_fn)))
-            for (work_remote, remote, env_fn) in zip(self.work_remotes, self.remotes, env_fns)]
+        self.bounds = chunk_bounds(nenvs, n_workers)
+        self.batch_size = nenvs if batch_size is None else batch_size
+        self.env_worker = np.repeat(np.arange(len(self.bounds)), [end - start for start, end in self.bounds])
+        self.pending = [None] * len(self.bounds)  # 异步模式下每个 worker 正在执行的命令
+        self.remotes, self.work_remotes = zip(*[Pipe() for _ in self.bounds])
+        self.ps = [Process(target=worker, args=(work_remote, remote, CloudpickleWrapper(env_fns[start:end])))
+            for (work_remote, remote, (start, end)) in zip(self.work_remotes, self.remotes, self.bounds)]
         for p in self.ps:
             p.daemon = True # if the main process crashes, we should not cause things to hang
             p.start()
@@ -117,29 +140,99 @@ class SubprocVecEnv(VecEnv):
         VecEnv.__init__(self, len(env_fns), observation_space, action_space)
 
     def step_async(self, actions):
-        for remote, action in zip(self.remotes, actions):
-            remote.send(('step', action))
+        if any(self.pending):
+            raise RuntimeError('asynchronous steps are pending, collect them with recv() first')
+        actions = np.asarray(actions)
+        for remote, (start, end) in zip(self.remotes, self.bounds):
+            remote.send(('step', actions[start:end]))
         self.waiting = True
 
     def step_wait(self):
         results = [remote.recv() for remote in self.remotes]
         self.waiting = False
         obs, rews, dones, infos = zip(*results)
-        return np.stack(obs), np.stack(rews), np.stack(dones), infos
+        return np.concatenate(obs), np.concatenate(rews), np.concatenate(dones), sum(infos, ())
 
     def reset(self):
+        self._drain_pending()
         for remote in self.remotes:
             remote.send(('reset', None))
-        return np.stack([remote.recv() for remote in self.remotes])
+        return np.concatenate([remote.recv() for remote in self.remotes])
+
+    # 丢弃异步模式下尚未取走的结果，避免之后的同步调用把它们当成自己的返回值
+    def _drain_pending(self):
+        for i, remote in enumerate(self.remotes):
+            if self.pending[i] is not None:
+                remote.recv()
+                self.pending[i] = None
+
+    # EnvPool 式的异步接口：async_reset() 之后循环 recv() 和 send()，先就绪的环境先返回，不等最慢的那个
+    def async_reset(self):
+        self._drain_pending()
+        for i, remote in enumerate(self.remotes):
+            remote.send(('reset', None))
+            self.pending[i] = 'reset'
+
+    def recv(self, batch_size=None):
+        """
+        Wait until at least batch_size envs have results and return
+        (obs, rews, dones, infos, env_ids). Every worker that is ready is
+        collected, so no worker is starved by faster ones; because of that,
+        and because workers report whole chunks, more than batch_size envs
+        may be returned. Results of a reset carry zero reward and done=False.
+        """
+        batch_size = self.batch_size if batch_size is None else batch_size
+        if not any(self.pending):
+            raise RuntimeError('recv() called with no pending reset or step, call async_reset() or send() first')
+        obs, rews, dones, infos, env_ids = [], [], [], [], []
+        count = 0
+        while count < batch_size and any(self.pending):
+            waiting = {self.remotes[i]: i for i, cmd in enumerate(self.pending) if cmd is not None}
+            for remote in wait(list(waiting)):
+                i = waiting[remote]
+                start, end = self.bounds[i]
+                if self.pending[i] == 'reset':
+                    obs.append(remote.recv())
+                    rews.append(np.zeros(end - start))
+                    dones.append(np.zeros(end - start, dtype=bool))
+                    infos.extend({} for _ in range(end - start))
+                else:
+                    ob, rew, done, info = remote.recv()
+                    obs.append(ob)
+                    rews.append(rew)
+                    dones.append(done)
+                    infos.extend(info)
+                env_ids.append(np.arange(start, end))
+                self.pending[i] = None
+                count += end - start
+        return np.concatenate(obs), np.concatenate(rews), np.concatenate(dones), infos, np.concatenate(env_ids)
+
+    # actions[k] 作用于 env_ids[k]；一个 worker 的整组环境需要一起提交
+    def send(self, actions, env_ids):
+        env_ids = np.asarray(env_ids, dtype=np.int64)
+        full = np.empty((self.nenvs,) + np.shape(actions)[1:], dtype=np.asarray(actions).dtype)
+        full[env_ids] = actions
+        submitted = np.zeros(self.nenvs, dtype=bool)
+        submitted[env_ids] = True
+        for i in np.unique(self.env_worker[env_ids]):
+            start, end = self.bounds[i]
+            if not submitted[start:end].all():
+                raise ValueError('envs {}..{} run in the same worker and must be sent together'.format(start, end - 1))
+            if self.pending[i] is not None:
+                raise ValueError('envs {}..{} have not been received yet'.format(start, end - 1))
+            self.remotes[i].send(('step', full[start:end]))
+            self.pending[i] = 'step'
 
     def reset_task(self):
+        self._drain_pending()
         for remote in self.remotes:
             remote.send(('reset_task', None))
-        return np.stack([remote.recv() for remote in self.remotes])
+        return np.concatenate([remote.recv() for remote in self.remotes])
 
     def close(self):
         if self.closed:
             return
+        self._drain_pending()
         if self.waiting:
             for remote in self.remotes:            
                 remote.recv()
@@ -150,4 +243,173 @@ class SubprocVecEnv(VecEnv):
             self.closed = True
             
     def __len__(self):
-        return self.nenvs
\ No newline at end of file
+        return self.nenvs
+
+
+class SharedArrays(object):
+    """
+    A group of numpy arrays backed by multiprocessing.shared_memory blocks.
+    The parent creates the blocks with specs {name: (shape, dtype)} and
+    workers attach to them by block name.
+    """
+    def __init__(self, specs, names=None):
+        self.specs = specs
+        self.owner = names is None
+        self.blocks = {}
+        self.arrays = {}
+        for key, (shape, dtype) in specs.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            if self.owner:
+                block = SharedMemory(create=True, size=nbytes)
+            else:
+                block = SharedMemory(name=names[key])
+            self.blocks[key] = block
+            self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            if self.owner:
+                self.arrays[key].fill(0)
+
+    def names(self):
+        return {key: block.name for key, block in self.blocks.items()}
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+
+def shmem_worker(remote, parent_remote, env_fn_wrapper):
+    parent_remote.close()
+    envs = [env_fn() for env_fn in env_fn_wrapper.x]
+    buffers = None
+    start = None
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == 'step':
+                actions = buffers['actions']
+                infos = []
+                for i, env in enumerate(envs, start):
+                    ob, reward, done, info = _step_env(env, actions[i])
+                    buffers['obs'][i] = ob
+                    buffers['rews'][i] = reward
+                    buffers['dones'][i] = done
+                    infos.append(info)
+                remote.send(infos)
+            elif cmd == 'reset':
+                for i, env in enumerate(envs, start):
+                    buffers['obs'][i] = env.reset()
+                remote.send(None)
+            elif cmd == 'reset_task':
+                for i, env in enumerate(envs, start):
+                    buffers['obs'][i] = env.reset_task()
+                remote.send(None)
+            elif cmd == 'attach':
+                specs, names, start = data
+                buffers = SharedArrays(specs, names)
+                remote.send(None)
+            elif cmd == 'close':
+                remote.close()
+                break
+            elif cmd == 'get_spaces':
+                remote.send((envs[0].observation_space, envs[0].action_space))
+            else:
+                raise NotImplementedError
+    finally:
+        if buffers is not None:
+            buffers.close()
+
+
+class ShmemVecEnv(VecEnv):
+    """
+    Like SubprocVecEnv, but actions, observations, rewards and dones are
+    exchanged through preallocated shared memory instead of being pickled.
+    The pipes only carry the short commands and the info objects.
+    """
+    def __init__(self, env_fns, spaces=None, n_workers=None):
+        self.waiting = False
+        self.closed = False
+        nenvs = len(env_fns)
+        self.nenvs = nenvs
+        self.bounds = chunk_bounds(nenvs, n_workers)
+        self.remotes, self.work_remotes = zip(*[Pipe() for _ in self.bounds])
+        # 先在父进程启动 resource_tracker，worker 与父进程共用它，共享内存只由父进程 unlink 一次
+        resource_tracker.ensure_running()
+        self.ps = [Process(target=shmem_worker, args=(work_remote, remote, CloudpickleWrapper(env_fns[start:end])))
+            for (work_remote, remote, (start, end)) in zip(self.work_remotes, self.remotes, self.bounds)]
+        for p in self.ps:
+            p.daemon = True # if the main process crashes, we should not cause things to hang
+            p.start()
+        for remote in self.work_remotes:
+            remote.close()
+
+        if spaces is None:
+            self.remotes[0].send(('get_spaces', None))
+            spaces = self.remotes[0].recv()
+        observation_space, action_space = spaces
+        VecEnv.__init__(self, len(env_fns), observation_space, action_space)
+
+        specs = {
+            'obs': ((nenvs,) + tuple(observation_space.shape), np.float64),
+            'actions': ((nenvs,) + tuple(action_space.shape), np.float64),
+            'rews': ((nenvs,), np.float64),
+            'dones': ((nenvs,), np.bool_),
+        }
+        self.buffers = SharedArrays(specs)
+        for remote, (start, end) in zip(self.remotes, self.bounds):
+            remote.send(('attach', (specs, self.buffers.names(), start)))
+        for remote in self.remotes:
+            remote.recv()
+
+    def step_async(self, actions):
+        self.buffers['actions'][:] = np.asarray(actions, dtype=np.float64).reshape(self.buffers['actions'].shape)
+        for remote in self.remotes:
+            remote.send(('step', None))
+        self.waiting = True
+
+    def step_wait(self):
+        infos = sum([remote.recv() for remote in self.remotes], [])
+        self.waiting = False
+        return self.buffers['obs'].copy(), self.buffers['rews'].copy(), self.buffers['dones'].copy(), infos
+
+    def reset(self):
+        self._drain_step()
+        for remote in self.remotes:
+            remote.send(('reset', None))
+        for remote in self.remotes:
+            remote.recv()
+        return self.buffers['obs'].copy()
+
+    # step_async 之后没有 step_wait 就同步调用时，先取走这一步的回复，否则管道里的回复会错位一条
+    def _drain_step(self):
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+            self.waiting = False
+
+    def reset_task(self):
+        self._drain_step()
+        for remote in self.remotes:
+            remote.send(('reset_task', None))
+        for remote in self.remotes:
+            remote.recv()
+        return self.buffers['obs'].copy()
+
+    def close(self):
+        if self.closed:
+            return
+        self._drain_step()
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for p in self.ps:
+            p.join()
+        self.buffers.close()
+        self.closed = True
+
+    def __len__(self):
+        return self.nenvs
@@ -5,17 +5,28 @@ curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝
 parent_path = os.path.dirname(curr_path)  # 父路径
 sys.path.append(parent_path)  # 添加路径到系统路径
 import numpy as np
-import torch
 
 from common.rotor_state_calculator import *
+from common.reward_spec import DistanceReward, TerminationBounds
 
-from quanser.hardware import HIL, MAX_STRING_LENGTH, EncoderQuadratureMode
+from common.sample_ring import SampleRing, slope_weights
+from common.sim_hil import open_card
+from quanser.hardware import MAX_STRING_LENGTH, Clock, EncoderQuadratureMode
 from quanser.q_misc import Calculus
 
 from array import array
 
 import time
 
+FINAL_STATE = np.array([0, 0, 25 / 180 * math.pi, 0, 0, 0])
+# 真机上不做越界终止（is_dead 原来恒返回 False），需要时传入 TerminationBounds
+TERMINATION = TerminationBounds.unbounded(6)
+# -distance(前三个角度) * 10 - |state[2] - final_state[2]| * 10 + 15
+REWARD_SPEC = DistanceReward(FINAL_STATE, [(slice(0, 3), 10), ([2], 10)], offset=15)
+# 编码器 [travel, pitch, elevation] 每个计数对应的弧度（含方向）
+COUNTS_TO_RAD = np.array([-1 / 8192, 1 / 4096, -1 / 4096]) * 2 * math.pi
+TASK_SAMPLES = 0xFFFFFFFF  # 采集任务一直运行到 task_stop
+
 
 class Space():
     def __init__(self, shape):
@@ -23,7 +34,32 @@ class Space():
 
 
 class MyEnv():
-    def __init__(self, ):
+    # card_type="sim_heli" 时使用 common.sim_hil 的仿真板卡，sim_options 传给 SimHIL（如 latency、realtime）
+    # acquisition="polled" 每步读一次编码器；"task" 由板卡时钟 clock 以 sample_rate 定时采样，每步把任务缓冲区里积压的样本
+    # 全部读进环形缓冲区，速度取最近 velocity_window 个样本对采样时刻 k / sample_rate 的最小二乘斜率
+    def __init__(self, reward_spec=REWARD_SPEC, termination=TERMINATION, card_type="ni_pcie_6351",
+                 card_identifier="0", sim_options=None, acquisition="polled", sample_rate=1000.0,
+                 clock=Clock.HARDWARE_CLOCK_0, velocity_window=20):
+        self.reward_spec = reward_spec
+        self.termination = termination
+        self.card_type = card_type
+        self.card_identifier = card_identifier
+        self.sim_options = {} if sim_options is None else sim_options
+        if acquisition not in ("polled", "task"):
+            raise ValueError('unknown acquisition mode {!r}'.format(acquisition))
+        self.acquisition = acquisition
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.task = None
+        if acquisition == "task":
+            # 任务缓冲区留 2 秒的余量，Python 循环偶尔卡顿也不会溢出；环形缓冲区只需覆盖速度窗口
+            self.task_buffer_size = int(2 * sample_rate)
+            # 每步先一次读完按 sample_rate 估计的积压样本，再读 2ms 的一块：这一块要等板卡新采的样本，最后一个样本是刚采到的
+            self.block_size = max(1, int(round(0.002 * sample_rate)))
+            self.sample_buffer = np.zeros(self.task_buffer_size * 3, dtype=np.int32)
+            self.ring = SampleRing(max(int(sample_rate), velocity_window), 3)
+            self.velocity_window = velocity_window
+            self.velocity_weights = slope_weights(velocity_window, sample_rate)
         #
         self.init_cart()
         self.init_diff()
@@ -33,13 +69,59 @@ class MyEnv():
         self.reset()
 
     def init_cart(self):
-        self.card = HIL()
-        self.card.open("ni_pcie_6351", "0")
+        self.card = open_card(self.card_type, self.card_identifier, **self.sim_options)
         self.card.set_card_specific_options("terminal_board=mx_series;", MAX_STRING_LENGTH)
-        channels = array('I', [0, 1, 2])
-        num_channels = len(channels)
+        # 通道和数据缓冲区只分配一次，每个控制周期复用
+        self.encoder_channels = array('I', [0, 1, 2])
+        self.analog_channels = array('I', [0, 1])
+        self.encoder_buffer = array('i', [0] * len(self.encoder_channels))
+        self.analog_buffer = array('d', [0.0] * len(self.analog_channels))
         modes = array('i', [EncoderQuadratureMode.X4, EncoderQuadratureMode.X4, EncoderQuadratureMode.X4])
-        self.card.set_encoder_quadrature_mode(channels, num_channels, modes)
+        self.card.set_encoder_quadrature_mode(self.encoder_channels, len(self.encoder_channels), modes)
+        # 预先绑定通道和缓冲区，控制周期内的 I/O 不再转换参数
+        self.io = self.card.prepare_io(encoder_input_channels=self.encoder_channels,
+                                       encoder_input_buffer=self.encoder_buffer,
+                                       analog_output_channels=self.analog_channels,
+                                       analog_output_buffer=self.analog_buffer)
+        if self.acquisition == "task":
+            self.start_acquisition()
+
+    def start_acquisition(self):
+        self.task = self.card.task_create_encoder_reader(self.task_buffer_size, self.encoder_channels,
+                                                         len(self.encoder_channels))
+        self.card.task_start(self.task, self.clock, self.sample_rate, TASK_SAMPLES)
+        self.drain_time = time.perf_counter()
+        self.ring.reset()
+
+    def stop_acquisition(self):
+        if self.task is None:
+            return
+        self.card.task_stop(self.task)
+        self.card.task_delete(self.task)
+        self.task = None
+
+    # 上次读完以来板卡采了约 elapsed * sample_rate 个样本（向下取整），一次读完后再读一块。读完的时刻比最后一个样本晚了
+    # 驱动的延迟，估计值可能少几个样本，少掉的由最后一块补上；多出的一块每步抵掉一块的积压，残留不会累积。
+    # 每步最多等板卡一块的时间，不按单次读取的耗时判断是否读完
+    def read_samples(self):
+        backlog = int((time.perf_counter() - self.drain_time) * self.sample_rate)
+        backlog = max(backlog, self.velocity_window - self.ring.total - self.block_size)
+        for num_samples in (min(backlog, self.task_buffer_size), self.block_size):
+            if num_samples <= 0:
+                continue
+            read = self.card.task_read_encoder(self.task, num_samples, self.sample_buffer)
+            self.ring.append(self.sample_buffer[:read * 3].reshape(read, 3))
+            if read < num_samples:  # 任务已停止
+                break
+        self.drain_time = time.perf_counter()
+
+    # 最新样本给出角度，最近 velocity_window 个带时间戳的样本给出角速度
+    def samples_to_state(self):
+        window = self.ring.latest(self.velocity_window)
+        angles = window[-1] * COUNTS_TO_RAD
+        velocities = self.velocity_weights @ window * COUNTS_TO_RAD
+        # 编码器顺序 [travel, pitch, elevation]，状态顺序 [elevation, pitch, travel, w_elevation, w_pitch, w_travel]
+        return np.concatenate([angles[::-1], velocities[::-1]])
 
     # 重置积分
     def init_diff(self):
@@ -53,21 +135,30 @@ class MyEnv():
 
     # new
     def change_v(self, *args):
-        v1 = args[0]
-        v2 = args[1]
-        _ao_channels = array('I', [0])  #
-        _ao_channels2 = array('I', [1])
-        _ao_buffer = array('d', [v1])  # Voltage 1
-        self.card.write_analog(_ao_channels, len(_ao_channels), _ao_buffer)
-        _ao_buffer2 = array('d', [v2])  # Voltage 2
-        self.card.write_analog(_ao_channels2, len(_ao_channels2), _ao_buffer2)
+        self.analog_buffer[0] = args[0]  # Voltage 1
+        self.analog_buffer[1] = args[1]  # Voltage 2
+        self.io.write()
 
     # new
     def make_observa(self):
-        channels = array('I', [0, 1, 2])
-        num_channels = len(channels)
-        buffer = array('i', [0] * num_channels)
-        self.card.read_encoder(channels, num_channels, buffer)
+        if self.acquisition == "task":
+            self.read_samples()
+            return self.samples_to_state()
+        self.io.read()
+        return self.counts_to_state(self.encoder_buffer)
+
+    # 一次 read_write 完成一个控制周期的 I/O：读编码器，紧接着写两个电机的电压
+    def read_write(self, v1, v2):
+        self.analog_buffer[0] = v1
+        self.analog_buffer[1] = v2
+        if self.acquisition == "task":
+            self.io.write()
+            self.read_samples()
+            return self.samples_to_state()
+        self.io.read_write()
+        return self.counts_to_state(self.encoder_buffer)
+
+    def counts_to_state(self, buffer):
         travel = -float(buffer[0]) / 8192 * 360 / 180 * math.pi
         pitch = float(buffer[1]) / 4096 * 360 / 180 * math.pi
         elevation = float(-buffer[2]) / 4096 * 360 / 180 * math.pi
@@ -90,10 +181,11 @@ class MyEnv():
         self.reward = 0
         self.reward_rate = 10  # todo 奖励10倍于距离缩小
         # fixme 设定一个最终状态（悬停目标）
-        self.final_state = np.array([0, 0, 25 / 180 * math.pi, 0, 0, 0])  # 最终需要的观测值
+        self.final_state = FINAL_STATE.copy()  # 最终需要的观测值
         self.change_v(0.0, 0.0)
         print('sleep2')
         time.sleep(4)
+        self.stop_acquisition()
         self.card.close()
         self.init_cart()
         self.init_diff()
@@ -116,30 +208,18 @@ class MyEnv():
 
     # 回合是否或者
     def is_dead(self, state: np.array):
-        # e = state[0] > 30 / 180 * math.pi or state[1] < -30 / 180
-        pitch = state[1] > 30 / 180 * math.pi or state[1] < -30 / 180
-        travel = state[2] > 30 / 180 * math.pi or state[0] < -30 / 180
-        m = np.max(state[:3]) >= 1.05 or np.min(state[:3]) <= -1.05
-        # v
-        e_v4 = state[3] > 0.50 or state[3] < -0.60
-        p_v5 = state[4] > 0.40 or state[4] < -0.40
-        t_v6 = state[5] > 0.40 or state[5] < -0.40
-        # return pitch or travel or e_v4 or p_v5 or t_v6
-        return False
+        return bool(self.termination(state))
 
     # 定义奖励：目前状态距目标的距离与前一次状态距目标的距离的差值按比例缩放
     def get_reward(self, state: np.array):
-        distance = self.o_distance(state[:3], self.final_state[:3])
-        e_dis = self.o_distance(state[2], self.final_state[2])
         # return -distance * self.reward_rate + 5
-        return -(distance * self.reward_rate) - (e_dis * self.reward_rate * 1) + 15
+        return self.reward_spec(state)
 
-    def step(self, action: torch.Tensor):
+    def step(self, action: np.ndarray):
         # TODO 每个回合的步骤是否超过阈值，判断是否结束
         # self.last_observation = device_next_state(self.last_observation, action.tolist())
         ac_real_v_list = (action * 1).tolist()
-        self.change_v(*ac_real_v_list)
-        self.last_observation = self.make_observa()
+        self.last_observation = self.read_write(*ac_real_v_list)
         reward = self.get_reward(self.last_observation)
         done = (self.is_dead(self.last_observation)) or (self.total_step >= 12000)
         if done:
@@ -148,7 +228,7 @@ class MyEnv():
         return self.last_observation, reward, done, 0
 
     def close(self):
-        return
+        self.stop_acquisition()
 
 
 if __name__ == '__main__':
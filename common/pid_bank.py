@@ -0,0 +1,65 @@
+import numpy as np
+
+'''数组化的 PID 组：增益、积分项、上一次输入、输出限幅都是同形状的数组（通常为 (N, k)），一次调用更新全部控制器
+计算方式与 simple_pid.PID 相同（比例项作用在误差上，微分项作用在测量值上，积分项按输出限幅钳位防止饱和），
+但使用固定的 dt，不读系统时间'''
+
+
+class PIDBank:
+    def __init__(self, Kp, Ki, Kd, setpoint=0.0, output_limits=(None, None), dt=0.001, shape=None):
+        if shape is None:
+            shape = np.broadcast(np.asarray(Kp), np.asarray(Ki), np.asarray(Kd), np.asarray(setpoint)).shape
+        self.shape = tuple(shape)
+        self.Kp = np.broadcast_to(np.asarray(Kp, dtype=np.float64), self.shape).copy()
+        self.Ki = np.broadcast_to(np.asarray(Ki, dtype=np.float64), self.shape).copy()
+        self.Kd = np.broadcast_to(np.asarray(Kd, dtype=np.float64), self.shape).copy()
+        self.setpoint = np.broadcast_to(np.asarray(setpoint, dtype=np.float64), self.shape).copy()
+        self.dt = dt
+        self.output_limits = output_limits
+        self.integral = np.zeros(self.shape)
+        self.last_input = np.zeros(self.shape)
+        self.has_last_input = np.zeros(self.shape, dtype=bool)
+        self.output = np.zeros(self.shape)
+
+    @property
+    def output_limits(self):
+        return self.lower, self.upper
+
+    # None 表示该方向不限幅
+    @output_limits.setter
+    def output_limits(self, limits):
+        lower, upper = limits
+        self.lower = np.broadcast_to(np.asarray(-np.inf if lower is None else lower, dtype=np.float64),
+                                     self.shape).copy()
+        self.upper = np.broadcast_to(np.asarray(np.inf if upper is None else upper, dtype=np.float64),
+                                     self.shape).copy()
+        if np.any(self.lower > self.upper):
+            raise ValueError('lower limit must be less than upper limit')
+
+    # 清空积分和微分历史；mask 为 None 时重置全部，否则只重置 mask 为 True 的控制器（如自动重置的环境所在的行）
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.shape, dtype=bool)
+        mask = np.broadcast_to(mask, self.shape)
+        self.integral[mask] = 0.0
+        self.last_input[mask] = 0.0
+        self.has_last_input[mask] = False
+        self.output[mask] = 0.0
+
+    def __call__(self, inputs, dt=None):
+        dt = self.dt if dt is None else dt
+        if dt <= 0:
+            raise ValueError('dt has negative value {}, must be positive'.format(dt))
+        inputs = np.broadcast_to(np.asarray(inputs, dtype=np.float64), self.shape)
+        error = self.setpoint - inputs
+        d_input = np.where(self.has_last_input, inputs - self.last_input, 0.0)
+
+        self.integral += self.Ki * error * dt
+        np.clip(self.integral, self.lower, self.upper, out=self.integral)  # Avoid integral windup
+
+        output = self.Kp * error + self.integral - self.Kd * d_input / dt
+        np.clip(output, self.lower, self.upper, out=self.output)
+
+        self.last_input[...] = inputs
+        self.has_last_input[...] = True
+        return self.output.copy()
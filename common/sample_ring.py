@@ -0,0 +1,44 @@
+import numpy as np
+
+'''定速采样的环形缓冲区：样本按块写入 (capacity, num_channels) 数组，total 记录写入过的样本数，
+latest 把最近 n 个样本按时间顺序拷进预先分配的缓冲区'''
+
+
+class SampleRing:
+    def __init__(self, capacity, num_channels, dtype=np.int32):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, num_channels), dtype=dtype)
+        self.out = np.zeros((capacity, num_channels), dtype=dtype)
+        self.reset()
+
+    def reset(self):
+        self.total = 0  # 写入过的样本总数
+
+    # block: (n, num_channels)，超过容量时只保留最后 capacity 个
+    def append(self, block):
+        n = len(block)
+        if n >= self.capacity:
+            block = block[n - self.capacity:]
+            self.total += n - self.capacity
+            n = self.capacity
+        i = self.total % self.capacity
+        first = min(n, self.capacity - i)
+        self.data[i:i + first] = block[:first]
+        self.data[:n - first] = block[first:]
+        self.total += n
+
+    # 最近 n 个样本，按时间从早到晚排列；返回的是内部缓冲区的视图，下次调用会被覆盖
+    def latest(self, n):
+        if n > min(self.total, self.capacity):
+            raise ValueError('only {} samples are available, {} requested'.format(min(self.total, self.capacity), n))
+        i = (self.total - n) % self.capacity
+        first = min(n, self.capacity - i)
+        self.out[:first] = self.data[i:i + first]
+        self.out[first:n] = self.data[:n - first]
+        return self.out[:n]
+
+
+# 等间隔采样下最小二乘直线斜率的权重：第 k 个样本的时刻为 k / rate，slope = weights @ samples，window 个样本
+def slope_weights(window, rate):
+    k = np.arange(window) - (window - 1) / 2
+    return k / np.sum(k ** 2) * rate
@@ -0,0 +1,473 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
+import math
+import time
+from array import array
+from collections import deque
+
+import numpy as np
+
+from common.heli_model import HELI_MODEL
+from common.integrators import INTEGRATORS
+
+'''仿真 HIL 板卡：方法签名与 quanser.hardware.HIL 相同（channels, num_channels, buffer，结果写进调用方的缓冲区），
+板卡类型 "sim_heli" 背后是直升机模型，不需要 QUARC 运行库，可以在任意机器上跑通和压测实机控制回路。
+编码器 0 通道 travel（8192 线/转，取反）、1 通道 pitch（4096）、2 通道 elevation（4096，取反），与 myenv_simulate 的换算一致；
+模拟输出 0、1 通道是两个电机的电压。模型按墙上时钟推进（realtime=False 时由 advance() 推进），
+同一 card_identifier 的直升机状态在 close/open 之间保留，编码器在 open 时清零，和实机一样'''
+
+SIM_CARD_TYPES = ('sim_heli',)
+ENCODER_COUNTS_PER_REV = (8192, 4096, 4096)
+ENCODER_SIGNS = (-1, 1, -1)
+ENCODER_STATE_INDEX = (2, 1, 0)  # 编码器通道 -> 模型状态 [elevation, pitch, travel, ...] 的下标
+NUM_ANALOG_OUTPUTS = 2
+# 升降角的机械限位：下限是桌面，上限挡住模型在 ±90° 处的奇异点；撞到限位时该方向的速度清零
+ELEVATION_LIMITS = (0.0, 60 / 180 * math.pi)
+
+
+class SimHILError(RuntimeError):
+    pass
+
+
+# 直升机本体：状态和仿真时间，按 card_identifier 共享
+class _Plant:
+    def __init__(self):
+        self.state = np.zeros(6)
+        self.time = None
+
+
+_PLANTS = {}
+
+
+class SimTask:
+    def __init__(self, samples_in_buffer, channels):
+        self.samples_in_buffer = samples_in_buffer
+        self.channels = channels
+        self.samples = deque()
+        self.running = False
+        self.period = 0.0
+        self.next_time = 0.0
+        self.remaining = 0  # 还要采的样本数，负数表示不限
+        self.overflowed = False
+
+
+class SimHIL:
+    def __init__(self, card_type=None, card_identifier=None, model=HELI_MODEL, method='rk4', timestep=0.001,
+                 latency=0.0, jitter=0.0, elevation_limits=ELEVATION_LIMITS, realtime=True):
+        self.model = model
+        self.step = INTEGRATORS[method]
+        self.timestep = timestep
+        self.latency = latency  # 每次 I/O 调用的延迟（秒），jitter 为附加的 |N(0, jitter)| 随机延迟
+        self.jitter = jitter
+        self.elevation_limits = elevation_limits  # 升降角的机械限位，None 表示不限制
+        self.realtime = realtime
+        self._plant = None
+        if card_type is not None or card_identifier is not None:
+            self.open(card_type, card_identifier)
+
+    # region Configuration
+
+    def open(self, card_type, card_identifier):
+        if card_type not in SIM_CARD_TYPES:
+            raise SimHILError('unknown simulated card type {!r}, expected one of {}'.format(card_type, SIM_CARD_TYPES))
+        self._plant = _PLANTS.setdefault(card_identifier, _Plant())
+        if self._plant.time is None:
+            self._plant.time = time.perf_counter() if self.realtime else 0.0
+        self.voltages = np.zeros(NUM_ANALOG_OUTPUTS)
+        self.tasks = []
+        self.watchdog_timeout = None
+        self.watchdog_deadline = None
+        self.watchdog_expired = False
+        self.expiration_voltages = {}
+        self._advance(self._now())  # 关闭期间电机断电，直升机落回桌面
+        self.encoder_zero = self._raw_counts()
+
+    def close(self):
+        if self._plant is None:
+            return
+        self._advance(self._now())
+        self._plant = None
+
+    def is_valid(self):
+        return self._plant is not None
+
+    def set_card_specific_options(self, options, size):
+        return
+
+    def set_encoder_quadrature_mode(self, channels, num_channels, modes):
+        return
+
+    def set_encoder_counts(self, channels, num_channels, counts):
+        self._io()
+        raw = self._raw_counts()
+        for i in range(num_channels):
+            self.encoder_zero[channels[i]] = raw[channels[i]] - counts[i]
+
+    # endregion
+
+    # region Immediate I/O
+
+    def read_encoder(self, channels, num_channels, buffer):
+        self._io()
+        self._read_encoder(channels, num_channels, buffer)
+
+    def read_analog(self, channels, num_channels, buffer):
+        self._io()
+        for i in range(num_channels):
+            buffer[i] = 0.0  # 没有接模拟输入
+
+    def write_analog(self, channels, num_channels, buffer):
+        self._io()
+        self._write_analog(channels, num_channels, buffer)
+
+    def read_write(self,
+                   analog_input_channels, num_analog_input_channels,
+                   encoder_input_channels, num_encoder_input_channels,
+                   digital_input_channels, num_digital_input_channels,
+                   other_input_channels, num_other_input_channels,
+
+                   analog_output_channels, num_analog_output_channels,
+                   pwm_output_channels, num_pwm_output_channels,
+                   digital_output_channels, num_digital_output_channels,
+                   other_output_channels, num_other_output_channels,
+
+                   analog_input_buffer,
+                   encoder_input_buffer,
+                   digital_input_buffer,
+                   other_input_buffer,
+
+                   analog_output_buffer,
+                   pwm_output_buffer,
+                   digital_output_buffer,
+                   other_output_buffer):
+        # 一次调用内先读后写；只有模拟输出接了电机，其余输出忽略
+        self._io()
+        self._read(encoder_input_channels, num_encoder_input_channels, encoder_input_buffer,
+                   (analog_input_buffer, num_analog_input_channels),
+                   (digital_input_buffer, num_digital_input_channels),
+                   (other_input_buffer, num_other_input_channels))
+        self._write_analog(analog_output_channels, num_analog_output_channels, analog_output_buffer)
+
+    def read(self,
+             analog_channels, num_analog_channels,
+             encoder_channels, num_encoder_channels,
+             digital_channels, num_digital_channels,
+             other_channels, num_other_channels,
+             analog_buffer,
+             encoder_buffer,
+             digital_buffer,
+             other_buffer):
+        self._io()
+        self._read(encoder_channels, num_encoder_channels, encoder_buffer,
+                   (analog_buffer, num_analog_channels),
+                   (digital_buffer, num_digital_channels),
+                   (other_buffer, num_other_channels))
+
+    def write(self,
+              analog_channels, num_analog_channels,
+              pwm_channels, num_pwm_channels,
+              digital_channels, num_digital_channels,
+              other_channels, num_other_channels,
+              analog_buffer,
+              pwm_buffer,
+              digital_buffer,
+              other_buffer):
+        self._io()
+        self._write_analog(analog_channels, num_analog_channels, analog_buffer)
+
+    # 与 HIL.prepare_io 相同：通道和缓冲区只传一次，之后 read()/write()/read_write() 不带参数
+    def prepare_io(self,
+                   analog_input_channels=None, analog_input_buffer=None,
+                   encoder_input_channels=None, encoder_input_buffer=None,
+                   digital_input_channels=None, digital_input_buffer=None,
+                   other_input_channels=None, other_input_buffer=None,
+                   analog_output_channels=None, analog_output_buffer=None,
+                   pwm_output_channels=None, pwm_output_buffer=None,
+                   digital_output_channels=None, digital_output_buffer=None,
+                   other_output_channels=None, other_output_buffer=None):
+        return SimPreparedIO(self,
+                             (analog_input_channels, analog_input_buffer),
+                             (encoder_input_channels, encoder_input_buffer),
+                             (digital_input_channels, digital_input_buffer),
+                             (other_input_channels, other_input_buffer),
+                             (analog_output_channels, analog_output_buffer),
+                             (pwm_output_channels, pwm_output_buffer),
+                             (digital_output_channels, digital_output_buffer),
+                             (other_output_channels, other_output_buffer))
+
+    # endregion
+
+    # region Task I/O
+
+    def task_create_encoder_reader(self, samples_in_buffer, channels, num_channels):
+        self._check_open()
+        task = SimTask(samples_in_buffer, [int(channels[i]) for i in range(num_channels)])
+        self.tasks.append(task)
+        return task
+
+    # 按 frequency 定时采样；clock 只用于兼容接口，仿真里所有时钟都一样准。num_samples <= 0 表示一直采
+    def task_start(self, task, clock, frequency, num_samples):
+        self._advance(self._now())
+        task.period = 1.0 / frequency
+        task.next_time = self._plant.time + task.period
+        task.remaining = num_samples if num_samples > 0 else -1
+        task.running = True
+
+    def task_flush(self, task):
+        return
+
+    def task_stop(self, task):
+        self._advance(self._now())
+        task.running = False
+
+    def task_stop_all(self):
+        for task in self.tasks:
+            self.task_stop(task)
+
+    def task_delete(self, task):
+        task.running = False
+        if task in self.tasks:
+            self.tasks.remove(task)
+
+    def task_delete_all(self):
+        for task in list(self.tasks):
+            self.task_delete(task)
+
+    # 与实机一样阻塞到攒够 num_samples 个样本；任务已停止或在攒够之前采完时返回实际读到的样本数（可能为 0），
+    # 只有任务缓冲区溢出时抛异常。buffer 按 [样本][通道] 排列
+    def task_read_encoder(self, task, num_samples, buffer):
+        self._advance(self._now())
+        missing = num_samples - len(task.samples)
+        if missing > 0 and task.running:
+            wait = missing if task.remaining < 0 else min(missing, task.remaining)
+            if self.realtime:
+                time.sleep(max(0.0, task.next_time + (wait - 1) * task.period - time.perf_counter()))
+            while task.running and len(task.samples) < num_samples:
+                self._advance(max(self._now(), task.next_time))
+        if task.overflowed:
+            raise SimHILError('task buffer overflow: more than {} samples were not read in time'.format(
+                task.samples_in_buffer))
+        num_read = min(num_samples, len(task.samples))
+        num_channels = len(task.channels)
+        for k in range(num_read):
+            for i, count in enumerate(task.samples.popleft()):
+                buffer[k * num_channels + i] = count
+        return num_read
+
+    # endregion
+
+    # region Watchdog
+
+    def watchdog_set_analog_expiration_state(self, channels, num_channels, voltages):
+        for i in range(num_channels):
+            self.expiration_voltages[int(channels[i])] = float(voltages[i])
+
+    def watchdog_start(self, timeout):
+        self._advance(self._now())
+        self.watchdog_timeout = timeout
+        self.watchdog_deadline = self._plant.time + timeout
+
+    def watchdog_stop(self):
+        self.watchdog_deadline = None
+        self.watchdog_timeout = None
+
+    def watchdog_reload(self):
+        self._advance(self._now())
+        if self.watchdog_expired:
+            return False
+        if self.watchdog_timeout is not None:
+            self.watchdog_deadline = self._plant.time + self.watchdog_timeout
+        return True
+
+    def watchdog_is_expired(self):
+        self._advance(self._now())
+        return self.watchdog_expired
+
+    def watchdog_clear(self):
+        self.watchdog_expired = False
+        if self.watchdog_timeout is not None:
+            self.watchdog_deadline = self._plant.time + self.watchdog_timeout
+
+    # endregion
+
+    # region Simulation
+
+    # realtime=False 时推进仿真时钟
+    def advance(self, seconds):
+        self._check_open()
+        self._advance(self._plant.time + seconds)
+
+    def get_state(self):
+        self._check_open()
+        return self._plant.state.copy()
+
+    def _check_open(self):
+        if self._plant is None:
+            raise SimHILError('the simulated card is not open')
+
+    def _now(self):
+        return time.perf_counter() if self.realtime else self._plant.time
+
+    # 模拟一次驱动往返的延迟，然后把模型推进到当前时刻
+    def _io(self):
+        self._check_open()
+        delay = self.latency + (abs(np.random.normal(0.0, self.jitter)) if self.jitter > 0 else 0.0)
+        if self.realtime:
+            if delay > 0:
+                time.sleep(delay)
+            self._advance(time.perf_counter())
+        else:
+            self._advance(self._plant.time + delay)
+
+    def _raw_counts(self):
+        state = self._plant.state
+        return [int(round(sign * state[index] / (2 * math.pi) * cpr))
+                for sign, index, cpr in zip(ENCODER_SIGNS, ENCODER_STATE_INDEX, ENCODER_COUNTS_PER_REV)]
+
+    def _counts(self):
+        return [raw - zero for raw, zero in zip(self._raw_counts(), self.encoder_zero)]
+
+    # 只有编码器接了直升机，其余输入 (buffer, num_channels) 读到 0
+    def _read(self, encoder_channels, num_encoder_channels, encoder_buffer, *zero_inputs):
+        for buffer, num_channels in zero_inputs:
+            for i in range(num_channels):
+                buffer[i] = 0
+        self._read_encoder(encoder_channels, num_encoder_channels, encoder_buffer)
+
+    def _read_encoder(self, channels, num_channels, buffer):
+        counts = self._counts()
+        for i in range(num_channels):
+            buffer[i] = counts[channels[i]]
+
+    def _write_analog(self, channels, num_channels, buffer):
+        if self.watchdog_expired:
+            raise SimHILError('watchdog expired, call watchdog_clear() before writing outputs')
+        for i in range(num_channels):
+            self.voltages[channels[i]] = buffer[i]
+
+    # 积分到 t_target；途中依次处理看门狗超时和各采集任务的采样时刻
+    def _advance(self, t_target):
+        plant = self._plant
+        while True:
+            t_next = t_target
+            if self.watchdog_deadline is not None and not self.watchdog_expired:
+                t_next = min(t_next, self.watchdog_deadline)
+            for task in self.tasks:
+                if task.running:
+                    t_next = min(t_next, task.next_time)
+            if t_next > plant.time:
+                self._integrate(t_next - plant.time)
+                plant.time = t_next
+            if self.watchdog_deadline is not None and not self.watchdog_expired \
+                    and self.watchdog_deadline <= plant.time:
+                self.watchdog_expired = True
+                for channel, voltage in self.expiration_voltages.items():
+                    self.voltages[channel] = voltage
+            for task in self.tasks:
+                if task.running and task.next_time <= plant.time:
+                    counts = self._counts()
+                    task.samples.append([counts[channel] for channel in task.channels])
+                    if len(task.samples) > task.samples_in_buffer:
+                        task.samples.popleft()
+                        task.overflowed = True
+                    task.next_time += task.period
+                    if task.remaining > 0:
+                        task.remaining -= 1
+                        task.running = task.remaining != 0
+            if t_next >= t_target:
+                break
+
+    def _integrate(self, duration):
+        n = max(1, int(math.ceil(duration / self.timestep - 1e-9)))
+        h = duration / n
+        state = self._plant.state
+        for _ in range(n):
+            state = self.step(self.model, state, self.voltages, h)
+            if self.elevation_limits is not None:
+                low, high = self.elevation_limits
+                if state[0] < low:
+                    state[0] = low
+                    state[3] = max(state[3], 0.0)
+                elif state[0] > high:
+                    state[0] = high
+                    state[3] = min(state[3], 0.0)
+        self._plant.state = state
+
+    # endregion
+
+
+class SimPreparedIO:
+    # 每组为 (channels, buffer)，按 read_write 的参数顺序：4 组输入，4 组输出
+    def __init__(self, card, *groups):
+        arguments = []
+        for channels, buffer in groups:
+            if channels is None:
+                arguments.append((None, 0, None))
+                continue
+            channels = array('I', channels)
+            if buffer is None:
+                raise ValueError('a buffer is required for channels {}'.format(list(channels)))
+            if len(buffer) < len(channels):
+                raise ValueError('the buffer has {} elements but {} channels were given'.format(len(buffer),
+                                                                                          len(channels)))
+            arguments.append((channels, len(channels), buffer))
+        channel_args = [tuple(argument for channels, num_channels, _ in arguments[i:i + 4]
+                              for argument in (channels, num_channels)) for i in (0, 4)]
+        buffer_args = [tuple(buffer for _, _, buffer in arguments[i:i + 4]) for i in (0, 4)]
+        self._read_args = channel_args[0] + buffer_args[0]
+        self._write_args = channel_args[1] + buffer_args[1]
+        self._read_write_args = channel_args[0] + channel_args[1] + buffer_args[0] + buffer_args[1]
+        self._card = card
+
+    def read(self):
+        self._card.read(*self._read_args)
+
+    def write(self):
+        self._card.write(*self._write_args)
+
+    def read_write(self):
+        self._card.read_write(*self._read_write_args)
+
+
+# card_type 为仿真板卡时返回 SimHIL（sim_options 传给 SimHIL），否则打开真实的 quanser HIL 板卡并忽略 sim_options
+def open_card(card_type, card_identifier, **sim_options):
+    if card_type in SIM_CARD_TYPES:
+        return SimHIL(card_type, card_identifier, **sim_options)
+    from quanser.hardware import HIL
+    return HIL(card_type, card_identifier)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser("Load test of the control loop on the simulated HIL card")
+    parser.add_argument("--duration", type=float, default=5.0, help="Test duration in seconds")
+    parser.add_argument("--rate", type=float, default=100.0, help="Control loop rate in Hz")
+    parser.add_argument("--latency", type=float, default=0.0002, help="Simulated I/O latency in seconds")
+    parser.add_argument("--voltage", type=float, default=2.0, help="Voltage written to both motors")
+    args = parser.parse_args()
+
+    card = open_card("sim_heli", "0", latency=args.latency)
+    encoder_channels = array('I', [0, 1, 2])
+    analog_channels = array('I', [0, 1])
+    counts = array('i', [0] * 3)
+    voltages = array('d', [args.voltage] * 2)
+    period = 1.0 / args.rate
+    late = []
+    start = time.perf_counter()
+    for k in range(int(args.duration * args.rate)):
+        deadline = start + (k + 1) * period
+        card.read_write(None, 0, encoder_channels, 3, None, 0, None, 0,
+                        analog_channels, 2, None, 0, None, 0, None, 0,
+                        None, counts, None, None, voltages, None, None, None)
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+        late.append(time.perf_counter() - deadline)
+    late = np.array(late) * 1e3
+    print('ticks: {}, lateness ms: mean {:.3f}, p99 {:.3f}, max {:.3f}'.format(
+        len(late), late.mean(), np.percentile(late, 99), late.max()))
+    print('encoder counts', list(counts), 'state', np.round(card.get_state(), 4))
+    card.close()
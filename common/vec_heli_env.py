@@ -0,0 +1,92 @@
+import sys
+import os
+
+curr_path = os.path.dirname(os.path.abspath(__file__))  # 当前文件所在绝对路径
+parent_path = os.path.dirname(curr_path)  # 父路径
+sys.path.append(parent_path)  # 添加路径到系统路径
+import numpy as np
+
+from common.heli_model import HELI_MODEL
+from common.integrators import integrate
+from common.multiprocessing_env import VecEnv
+from common.myenv import REWARD_SPEC, TERMINATION, Space
+
+'''进程内的向量化仿真环境：N 个直升机的状态放在一个 (N, 6) 数组里，奖励、is_dead 和自动重置都是数组运算'''
+
+
+class VecHeliEnv(VecEnv):
+    # 默认参数与 common.myenv.MyEnv 一致：每步一个 0.001s 的欧拉步，50000 步截断
+    def __init__(self, num_envs, control_period=None, method='euler', timestep=0.001, max_episode_steps=50000,
+                 reset_noise=0.0, model=HELI_MODEL, reward_spec=REWARD_SPEC, termination=TERMINATION):
+        VecEnv.__init__(self, num_envs, Space(6), Space(2))
+        self.control_period = timestep if control_period is None else control_period
+        self.method = method
+        self.timestep = timestep
+        self.max_episode_steps = max_episode_steps
+        self.reset_noise = reset_noise  # 重置时在初始状态上加的均匀噪声幅度，0 表示全部从零状态开始
+        self.model = model
+        self.reward_spec = reward_spec
+        self.termination = termination
+        self.states = np.zeros((num_envs, 6))
+        self.total_steps = np.ones(num_envs, dtype=np.int64)
+        self.actions = np.zeros((num_envs, 2))
+
+    def seed(self, seed):
+        np.random.seed(seed)
+
+    def _reset_envs(self, mask):
+        n = int(np.count_nonzero(mask))
+        if n == 0:
+            return
+        self.states[mask] = 0.0
+        if self.reset_noise > 0:
+            self.states[mask] += np.random.uniform(-self.reset_noise, self.reset_noise, (n, 6))
+        self.total_steps[mask] = 1
+
+    def reset(self):
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.states.copy()
+
+    def is_dead(self, states):
+        return self.termination(states)
+
+    def get_reward(self, states):
+        return self.reward_spec(states)
+
+    def step_async(self, actions):
+        self.actions[:] = np.asarray(actions, dtype=np.float64)
+
+    # 结束的环境自动重置：返回的观测是重置后的状态，结束时的状态放在 info['terminal_observation']
+    def step_wait(self):
+        self.states = integrate(self.model, self.states, self.actions, self.control_period, self.method,
+                                self.timestep)
+        rewards = self.get_reward(self.states)
+        dones = self.is_dead(self.states) | (self.total_steps >= self.max_episode_steps)
+        self.total_steps += 1
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]['terminal_observation'] = self.states[i].copy()
+            self._reset_envs(dones)
+        return self.states.copy(), rewards, dones, infos
+
+    def close(self):
+        return
+
+    def __len__(self):
+        return self.num_envs
+
+
+if __name__ == '__main__':
+    import time
+
+    env = VecHeliEnv(256, control_period=0.1, method='rk4', timestep=0.05, reset_noise=0.01)
+    env.seed(0)
+    obs = env.reset()
+    t = time.perf_counter()
+    episodes = 0
+    for _ in range(1000):
+        obs, rewards, dones, infos = env.step(np.random.uniform(1.5, 3.0, (env.num_envs, 2)))
+        episodes += int(dones.sum())
+    print('{:.0f} env-steps/s, {} episodes finished'.format(
+        env.num_envs * 1000 / (time.perf_counter() - t), episodes))
@@ -0,0 +1,39 @@
+"""Generates the out-of-line (ABI mode) cffi modules for the QUARC libraries.
+
+Each generated module holds the C definitions already parsed, so loading a library skips parsing its ``cdef`` at
+runtime. The modules are written next to the modules that declare the libraries and are picked up automatically;
+a module whose C definitions no longer match is ignored. Run again after changing any ``cdef``::
+
+    python -m quanser.build_cffi
+"""
+import importlib
+import os
+
+from cffi import FFI
+
+LIBRARY_MODULES = ["quanser.common.utilities", "quanser.hardware.hil", "quanser.multimedia.video",
+                   "quanser.communications.stream", "quanser.devices.interfaces"]
+
+
+def build(module_names=LIBRARY_MODULES):
+    """Writes the out-of-line module of each library declared in ``module_names`` and returns their paths."""
+    paths = []
+    for module_name in module_names:
+        module = importlib.import_module(module_name)
+        library = module._library
+        package_name, out_of_line_name = library.out_of_line_module.rsplit(".", 1)
+        path = os.path.join(os.path.dirname(importlib.import_module(package_name).__file__), out_of_line_name + ".py")
+
+        builder = FFI()
+        builder.cdef(library.cdef)
+        builder.set_source(out_of_line_name, None)
+        builder.emit_python_code(path)
+        with open(path, "a") as file:
+            file.write("\nCDEF_HASH = %r\n" % library.cdef_hash)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    for path in build():
+        print(path)
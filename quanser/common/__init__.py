@@ -1,2 +1,2 @@
 from .exceptions import GenericError
-from .utilities import get_platform, get_current_locale, get_error_message
+from .utilities import get_platform, get_current_locale, get_error_message, LazyLibrary
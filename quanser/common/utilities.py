@@ -1,8 +1,8 @@
+import hashlib
+import importlib
 import os
 import sys
 
-from cffi import FFI
-
 from quanser.common.exceptions import GenericError
 
 
@@ -21,18 +21,89 @@ def add_quarc_path():
         if quarc_dir != None:
             os.add_dll_directory(quarc_dir)
 
-ffi = FFI()
-ffi.cdef("""
+class LazyLibrary:
+    """Parses the C definitions and loads a QUARC shared library on first use.
+
+    Importing a module that declares a library costs nothing until one of its functions is called, so the enumerations
+    and types can be used on machines without QUARC. If the out-of-line module generated by ``python -m
+    quanser.build_cffi`` is importable and was built from the same C definitions, its pre-parsed FFI is used instead
+    of parsing the definitions at runtime.
+    """
+
+    def __init__(self, name, cdef, out_of_line_module=None):
+        self.name = name
+        self.cdef = cdef
+        self.cdef_hash = hashlib.sha1(cdef.encode("utf-8")).hexdigest()
+        self.out_of_line_module = out_of_line_module
+        self._ffi = None
+        self._lib = None
+
+    @property
+    def ffi(self):
+        """The FFI holding the parsed C definitions."""
+        if self._ffi is None:
+            self._ffi = self._load_out_of_line_ffi()
+            if self._ffi is None:
+                from cffi import FFI
+                ffi = FFI()
+                ffi.cdef(self.cdef)
+                self._ffi = ffi
+        return self._ffi
+
+    @property
+    def lib(self):
+        """The loaded shared library. Raises OSError if the library cannot be found."""
+        if self._lib is None:
+            add_quarc_path()
+            self._lib = self.ffi.dlopen(self.name)
+        return self._lib
+
+    def ffi_proxy(self, namespace, name):
+        """Returns a stand-in for ``ffi`` that replaces itself with the real FFI in ``namespace[name]`` on first use."""
+        return _LazyProxy(self, "ffi", namespace, name)
+
+    def lib_proxy(self, namespace, name):
+        """Returns a stand-in for the library that replaces itself with the loaded library in ``namespace[name]`` on
+        first use."""
+        return _LazyProxy(self, "lib", namespace, name)
+
+    def _load_out_of_line_ffi(self):
+        if self.out_of_line_module is None:
+            return None
+        try:
+            module = importlib.import_module(self.out_of_line_module)
+        except ImportError:
+            return None
+        if getattr(module, "CDEF_HASH", None) != self.cdef_hash:
+            return None
+        return module.ffi
+
+
+class _LazyProxy:
+    __slots__ = ("_library", "_attribute", "_namespace", "_name")
+
+    def __init__(self, library, attribute, namespace, name):
+        self._library = library
+        self._attribute = attribute
+        self._namespace = namespace
+        self._name = name
+
+    def __getattr__(self, name):
+        target = getattr(self._library, self._attribute)
+        self._namespace[self._name] = target
+        return getattr(target, name)
+
+
+_library = LazyLibrary("quanser_runtime", """
     typedef signed int  t_int;
     typedef t_int       t_error;
 
     t_error msg_get_current_localeW(wchar_t * buffer, size_t buffer_size);
     
     t_error msg_get_error_messageW(const wchar_t * locale, t_error error_code, wchar_t * buffer, size_t length);
-""")
-
-add_quarc_path()
-runtime_lib = ffi.dlopen("quanser_runtime")
+""", "quanser.common._quanser_runtime_cffi")
+ffi = _library.ffi_proxy(globals(), "ffi")
+runtime_lib = _library.lib_proxy(globals(), "runtime_lib")
 
 _WCHAR_T_PTR = "wchar_t *"
 _WCHAR_T_ARRAY = "wchar_t[]"
@@ -1,14 +1,13 @@
 import os
 
-from cffi import FFI
+from quanser.common.utilities import LazyLibrary
 
 from quanser.communications import PollFlag, BooleanProperty, Timeout, StreamError
 
 # region Setup
 
 
-ffi = FFI()
-ffi.cdef("""
+_library = LazyLibrary("quanser_communications", """
     /* Type Definitions */
     
     typedef char                t_boolean;
@@ -91,9 +90,9 @@ ffi.cdef("""
     t_int stream_receive(t_stream stream, void * buffer, t_int buffer_size);
     
     t_error stream_flush(t_stream stream);
-""")
-
-communications_lib = ffi.dlopen("quanser_communications")
+""", "quanser.communications._quanser_communications_cffi")
+ffi = _library.ffi_proxy(globals(), "ffi")
+communications_lib = _library.lib_proxy(globals(), "communications_lib")
 
 # endregion
 
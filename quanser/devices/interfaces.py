@@ -1,7 +1,7 @@
 import sys
 import os
 
-from cffi import FFI
+from quanser.common.utilities import LazyLibrary
 
 from quanser.devices import RangingDistance, RangingMeasurementMode, RangingMeasurements, DeviceError
 
@@ -9,8 +9,7 @@ from quanser.devices import RangingDistance, RangingMeasurementMode, RangingMeas
 # region Setup
 
 
-ffi = FFI()
-ffi.cdef("""
+_library = LazyLibrary("quanser_devices", """
     /* Type Definitions */
     
     typedef unsigned char   t_ubyte;    /* must always be 8 bits */
@@ -134,9 +133,9 @@ ffi.cdef("""
                                  t_uint16 max_force_feedback_effects, t_double force_feedback_gain, t_game_controller * game_controller);
     t_error game_controller_poll(t_game_controller controller, t_game_controller_states * state, t_boolean * is_new);
     t_error game_controller_close(t_game_controller controller); 
-""")
-
-devices_lib = ffi.dlopen("quanser_devices")
+""", "quanser.devices._quanser_devices_cffi")
+ffi = _library.ffi_proxy(globals(), "ffi")
+devices_lib = _library.lib_proxy(globals(), "devices_lib")
 
 # endregion
 
@@ -2,4 +2,4 @@ from .enumerations import AnalogInputConfiguration, Clock, ClockMode, DigitalSta
     IntegerProperty, DoubleProperty, StringProperty
 from .exceptions import HILError
 from .types import Version, MAX_STRING_LENGTH
-from .hil import HIL
+from .hil import HIL, PreparedIO
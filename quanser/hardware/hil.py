@@ -1,7 +1,8 @@
 import os
 import sys
+from array import array
 
-from cffi import FFI
+from quanser.common.utilities import LazyLibrary
 
 from quanser.hardware import (AnalogInputConfiguration, Clock, ClockMode, DigitalState, EncoderQuadratureMode, PWMMode,
                               IntegerProperty, DoubleProperty, StringProperty, HILError, Version, MAX_STRING_LENGTH)
@@ -15,8 +16,7 @@ _is_legacy_python = sys.version_info < (3, 0)
 # region Setup
 
 
-ffi = FFI()
-ffi.cdef("""
+_library = LazyLibrary("hil", """
     /* Type Definitions */
 
     typedef char            t_boolean;
@@ -580,9 +580,9 @@ ffi.cdef("""
     t_error hil_watchdog_clear(t_card card);
 
     t_error hil_watchdog_stop(t_card card);
-""")
-
-hil_lib = ffi.dlopen("hil")
+""", "quanser.hardware._hil_cffi")
+ffi = _library.ffi_proxy(globals(), "ffi")
+hil_lib = _library.lib_proxy(globals(), "hil_lib")
 
 # endregion
 
@@ -3584,6 +3584,74 @@ class HIL:
         if result < 0:
             raise HILError(result)
 
+    def prepare_io(self,
+                   analog_input_channels=None, analog_input_buffer=None,
+                   encoder_input_channels=None, encoder_input_buffer=None,
+                   digital_input_channels=None, digital_input_buffer=None,
+                   other_input_channels=None, other_input_buffer=None,
+                   analog_output_channels=None, analog_output_buffer=None,
+                   pwm_output_channels=None, pwm_output_buffer=None,
+                   digital_output_channels=None, digital_output_buffer=None,
+                   other_output_channels=None, other_output_buffer=None):
+        """Prepares immediate I/O on a fixed set of channels and buffers.
+
+        The channel arrays and buffers are converted to cffi pointers once, so the returned `PreparedIO` performs
+        `read`, `write` and `read_write` without re-validating or converting any argument. Use it in control loops
+        where the per-call wrapper overhead is a visible fraction of the sampling period.
+
+        Parameters
+        ----------
+        analog_input_channels, encoder_input_channels, digital_input_channels, other_input_channels : array_like or None
+            The channel numbers of the inputs to read, or ``None`` if no channels of that kind are read. Any sequence
+            of integers is accepted; it is copied once.
+        analog_output_channels, pwm_output_channels, digital_output_channels, other_output_channels : array_like or None
+            The channel numbers of the outputs to write, or ``None`` if no channels of that kind are written.
+        analog_input_buffer, encoder_input_buffer, digital_input_buffer, other_input_buffer : array_like or None
+            The buffers receiving the values read, one element per channel, with the same element types as in
+            `read_write`. Required for every input kind that has channels. The buffers are used in place, so they must
+            stay allocated, and must not be resized, while the `PreparedIO` is in use.
+        analog_output_buffer, pwm_output_buffer, digital_output_buffer, other_output_buffer : array_like or None
+            The buffers holding the values to write, one element per channel. Update their contents in place before
+            each `write` or `read_write`.
+
+        Returns
+        -------
+        PreparedIO
+            The prepared I/O. It is bound to the current card handle and must not be used after the card is closed.
+
+        Raises
+        ------
+        ValueError
+            If channels are given without a buffer, or a buffer has fewer elements than there are channels.
+
+        Example
+        -------
+        Read three encoders and write two analog outputs once per control tick.
+
+        >>> import numpy as np
+        >>> from quanser.hardware import HIL
+        >>> card = HIL("q8_usb", "0")
+        >>> counts = np.zeros(3, dtype=np.int32)
+        >>> voltages = np.zeros(2, dtype=np.float64)
+        >>> io = card.prepare_io(encoder_input_channels=[0, 1, 2], encoder_input_buffer=counts,
+        ...                      analog_output_channels=[0, 1], analog_output_buffer=voltages)
+        >>> voltages[:] = [1.5, 1.5]
+        >>> io.read_write()
+        >>> # ...
+        ...
+        >>> card.close()
+
+        """
+        return PreparedIO(self,
+                          analog_input_channels, analog_input_buffer,
+                          encoder_input_channels, encoder_input_buffer,
+                          digital_input_channels, digital_input_buffer,
+                          other_input_channels, other_input_buffer,
+                          analog_output_channels, analog_output_buffer,
+                          pwm_output_channels, pwm_output_buffer,
+                          digital_output_channels, digital_output_buffer,
+                          other_output_channels, other_output_buffer)
+
     # endregion
 
     # endregion
@@ -6796,4 +6864,93 @@ class HIL:
 
     # endregion
 
+
+class PreparedIO:
+    """Immediate I/O on a fixed set of channels whose cffi arguments have been prepared once.
+
+    Create it with `HIL.prepare_io`. `read`, `write` and `read_write` take no arguments: values are read into, and
+    written from, the buffers passed to `HIL.prepare_io`.
+    """
+
+    def __init__(self, card,
+                 analog_input_channels, analog_input_buffer,
+                 encoder_input_channels, encoder_input_buffer,
+                 digital_input_channels, digital_input_buffer,
+                 other_input_channels, other_input_buffer,
+                 analog_output_channels, analog_output_buffer,
+                 pwm_output_channels, pwm_output_buffer,
+                 digital_output_channels, digital_output_buffer,
+                 other_output_channels, other_output_buffer):
+        handle = card._card if card._card is not None else ffi.NULL
+        inputs = [self._prepare(analog_input_channels, analog_input_buffer, _DOUBLE_ARRAY),
+                  self._prepare(encoder_input_channels, encoder_input_buffer, _INT32_ARRAY),
+                  self._prepare(digital_input_channels, digital_input_buffer, _BOOLEAN_ARRAY),
+                  self._prepare(other_input_channels, other_input_buffer, _DOUBLE_ARRAY)]
+        outputs = [self._prepare(analog_output_channels, analog_output_buffer, _DOUBLE_ARRAY),
+                   self._prepare(pwm_output_channels, pwm_output_buffer, _DOUBLE_ARRAY),
+                   self._prepare(digital_output_channels, digital_output_buffer, _BOOLEAN_ARRAY),
+                   self._prepare(other_output_channels, other_output_buffer, _DOUBLE_ARRAY)]
+        input_channels = tuple(argument for channels, num_channels, _ in inputs for argument in (channels, num_channels))
+        output_channels = tuple(argument for channels, num_channels, _ in outputs for argument in (channels, num_channels))
+        input_buffers = tuple(buffer for _, _, buffer in inputs)
+        output_buffers = tuple(buffer for _, _, buffer in outputs)
+
+        self._read_args = (handle,) + input_channels + input_buffers
+        self._write_args = (handle,) + output_channels + output_buffers
+        self._read_write_args = (handle,) + input_channels + output_channels + input_buffers + output_buffers
+        self._hil_read = hil_lib.hil_read
+        self._hil_write = hil_lib.hil_write
+        self._hil_read_write = hil_lib.hil_read_write
+
+    @staticmethod
+    def _prepare(channels, buffer, buffer_type):
+        if channels is None:
+            return ffi.NULL, 0, ffi.NULL
+        channels = array("I", channels)
+        if buffer is None:
+            raise ValueError("a buffer is required for channels %s" % list(channels))
+        if len(buffer) < len(channels):
+            raise ValueError("the buffer has %d elements but %d channels were given" % (len(buffer), len(channels)))
+        # The cdata objects returned by from_buffer keep the channel array and the buffer alive.
+        return ffi.from_buffer(_UINT32_ARRAY, channels), len(channels), ffi.from_buffer(buffer_type, buffer)
+
+    def read(self):
+        """Reads the prepared input channels into their buffers.
+
+        Raises
+        ------
+        HILError
+            On non-zero return code. A suitable error message may be retrieved using `get_error_message`.
+
+        """
+        result = self._hil_read(*self._read_args)
+        if result < 0:
+            raise HILError(result)
+
+    def write(self):
+        """Writes the contents of the prepared output buffers to their channels.
+
+        Raises
+        ------
+        HILError
+            On non-zero return code. A suitable error message may be retrieved using `get_error_message`.
+
+        """
+        result = self._hil_write(*self._write_args)
+        if result < 0:
+            raise HILError(result)
+
+    def read_write(self):
+        """Reads the prepared inputs and then writes the prepared outputs in a single call, like `HIL.read_write`.
+
+        Raises
+        ------
+        HILError
+            On non-zero return code. A suitable error message may be retrieved using `get_error_message`.
+
+        """
+        result = self._hil_read_write(*self._read_write_args)
+        if result < 0:
+            raise HILError(result)
+
 # endregion
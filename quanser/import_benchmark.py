@@ -0,0 +1,61 @@
+"""Measures the startup cost of the quanser package.
+
+Every measurement runs in a fresh interpreter and reports, per package, the time to import it, to parse the C
+definitions of its library (from the out-of-line module when one has been built with ``python -m quanser.build_cffi``)
+and to load the shared library. Loading is reported as unavailable on machines without QUARC::
+
+    python -m quanser.import_benchmark --repeat 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PACKAGES = [("quanser.hardware", "quanser.hardware.hil"),
+            ("quanser.multimedia", "quanser.multimedia.video"),
+            ("quanser.communications", "quanser.communications.stream"),
+            ("quanser.devices", "quanser.devices.interfaces")]
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+library = importlib.import_module(sys.argv[2])._library
+library.ffi
+parsed = time.perf_counter()
+try:
+    library.lib
+    loaded = time.perf_counter() - parsed
+except OSError:
+    loaded = None
+print(json.dumps({"import": imported - start, "cdef": parsed - imported, "dlopen": loaded,
+                  "out_of_line": type(library.ffi).__module__ != "cffi.api"}))
+"""
+
+
+def measure(package, library_module, repeat=5):
+    """Returns the median import, cdef and dlopen times in seconds over ``repeat`` fresh interpreters."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", _PROBE, package, library_module])
+        runs.append(json.loads(output))
+    result = {"out_of_line": runs[0]["out_of_line"]}
+    for key in ("import", "cdef", "dlopen"):
+        values = [run[key] for run in runs if run[key] is not None]
+        result[key] = statistics.median(values) if values else None
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Import time of the quanser package")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per package")
+    args = parser.parse_args()
+
+    print("{:<24} {:>10} {:>10} {:>10} {:>12}".format("package", "import ms", "cdef ms", "dlopen ms", "out-of-line"))
+    for package, library_module in PACKAGES:
+        result = measure(package, library_module, args.repeat)
+        dlopen = "n/a" if result["dlopen"] is None else "{:.2f}".format(result["dlopen"] * 1e3)
+        print("{:<24} {:>10.2f} {:>10.2f} {:>10} {:>12}".format(package, result["import"] * 1e3, result["cdef"] * 1e3,
+                                                                dlopen, str(result["out_of_line"])))
@@ -1,6 +1,6 @@
 import os
 
-from cffi import FFI
+from quanser.common.utilities import LazyLibrary
 
 from quanser.multimedia import (ImageDataType, ImageFormat, Video3DProperty, Video3DStreamType,
                                 VideoCapturePropertyCode, VideoCaptureAttribute, MediaError)
@@ -9,8 +9,7 @@ from quanser.multimedia import (ImageDataType, ImageFormat, Video3DProperty, Vid
 # region Setup
 
 
-ffi = FFI()
-ffi.cdef("""
+_library = LazyLibrary("quanser_media", """
     /* Common Type Definitions */
     
     typedef char                t_boolean;
@@ -212,9 +211,9 @@ ffi.cdef("""
     t_error video3d_frame_get_data(t_video3d_frame frame, void * data);
     
     t_error video3d_frame_get_meters(t_video3d_frame frame, t_single * data);
-""")
-
-media_lib = ffi.dlopen("quanser_media")
+""", "quanser.multimedia._quanser_media_cffi")
+ffi = _library.ffi_proxy(globals(), "ffi")
+media_lib = _library.lib_proxy(globals(), "media_lib")
 
 # endregion
 